@@ -0,0 +1,83 @@
+"""Semantic answer cache: reuse the result ids of a nearby earlier query.
+
+Paraphrases such as "chinese fried rice" and "fried rice chinese style" embed
+close together, so after the query is encoded a one-vector lookup in a small
+in-memory FAISS index of recent query embeddings can stand in for lexical
+search, the FAISS search over the corpus and rank fusion. Entries are evicted
+LRU, and the whole cache is dropped when the engine loads a new artifact
+version.
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+class AnswerCache:
+    def __init__(self, dim, max_size=1000, max_distance=0.1):
+        import faiss
+
+        # Squared L2 between normalized MiniLM embeddings; 0.1 ~ cosine 0.95.
+        self.max_distance = max_distance
+        self.max_size = max_size
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self._index = faiss.IndexIDMap2(faiss.IndexFlatL2(dim))
+        self._entries = OrderedDict()  # slot -> (top_k, ids)
+        self._next_slot = 0
+        self._lock = threading.Lock()
+
+    def _nearest(self, vector):
+        if not self._index.ntotal:
+            return None
+        D, I = self._index.search(np.ascontiguousarray(vector, dtype="float32").reshape(1, -1), 1)
+        if I[0, 0] == -1 or D[0, 0] > self.max_distance:
+            return None
+        return int(I[0, 0])
+
+    def get(self, vector, top_k):
+        with self._lock:
+            slot = self._nearest(vector)
+            entry = self._entries.get(slot)
+            # A cached top-3 cannot answer a request for 5.
+            if entry is None or entry[0] < top_k:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(slot)
+            self.hits += 1
+            return entry[1][:top_k]
+
+    def put(self, vector, top_k, ids, version=None):
+        with self._lock:
+            if version != self.version:
+                return  # computed against artifacts that have since been replaced
+            slot = self._nearest(vector)
+            if slot is not None:
+                self._index.remove_ids(np.asarray([slot], dtype="int64"))
+                del self._entries[slot]
+            slot = self._next_slot
+            self._next_slot += 1
+            self._index.add_with_ids(
+                np.ascontiguousarray(vector, dtype="float32").reshape(1, -1),
+                np.asarray([slot], dtype="int64"),
+            )
+            self._entries[slot] = (top_k, list(ids))
+            if len(self._entries) > self.max_size:
+                evicted, _ = self._entries.popitem(last=False)
+                self._index.remove_ids(np.asarray([evicted], dtype="int64"))
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._entries),
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def clear(self, version=None):
+        with self._lock:
+            self._index.reset()
+            self._entries.clear()
+            self.version = version
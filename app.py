@@ -1,12 +1,16 @@
+import atexit
+import os
+import time
 import streamlit as st
-import pandas as pd
-import faiss
-import pickle
-import numpy as np
-from sentence_transformers import SentenceTransformer
 from streamlit.components.v1 import html
+from client import RemoteEngine
+from engine import RecipeEngine
+from chat import BUTTONS, Chat
+from metrics import METRICS, span
 
 st.set_page_config(page_title="Recipe Chatbot", page_icon="🍲", layout="wide")
+run_started = time.perf_counter()
+METRICS.incr("reruns")
 
 st.markdown(
     """
@@ -120,39 +124,23 @@ st.markdown(
 )
 
 @st.cache_resource
-def load_data():
-    df = pd.read_pickle("cleaned_recipes.pkl")
-    with open("recipe_texts.pkl", "rb") as f:
-        corpus = pickle.load(f)
-    index = faiss.read_index("recipe_faiss.index")
-    model = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2") 
-    return df, corpus, index, model
+def load_engine():
+    # With RECIPE_API_URL set the UI is a thin client of service.py;
+    # otherwise retrieval runs in this process.
+    metrics_port = os.environ.get("RECIPE_METRICS_PORT")
+    if metrics_port:
+        METRICS.serve(int(metrics_port))
+    api_url = os.environ.get("RECIPE_API_URL")
+    if api_url:
+        return RemoteEngine(api_url)
+    engine = RecipeEngine()
+    print(engine.startup_report())
+    if engine.query_cache.path:
+        atexit.register(engine.query_cache.save)
+    return engine
 
-df, corpus, index, model = load_data()
-
-def search_recipe_by_title(query, top_k=3):
-    query_vec = model.encode([query])
-    D, I = index.search(np.array(query_vec, dtype="float32"), top_k)
-    results = [
-        df.iloc[idx] for dist, idx in zip(D[0], I[0]) if idx != -1 and dist <= 1.5
-    ]
-    return results if results else None
-
-
-def format_list(raw_text):
-    if isinstance(raw_text, str):
-        cleaned_text = raw_text.strip("[]").replace('"', "").replace("'", "")
-        items = [x.strip() for x in cleaned_text.split(",") if x.strip()]
-        return "\n".join([f"- {i}" for i in items])
-    return raw_text
-
-
-def format_steps(raw_text):
-    if isinstance(raw_text, str):
-        items = [x.strip() for x in raw_text.split(". ") if x.strip()]
-        return "\n".join([f"{idx+1}. {i}" for idx, i in enumerate(items)])
-    return raw_text
 
+engine = load_engine()
 
 def auto_scroll():
     js = """
@@ -165,18 +153,36 @@ def auto_scroll():
     html(js, height=0)
 
 
+def message_html(message):
+    wrapper_class = (
+        "user-message-wrapper"
+        if message["role"] == "user"
+        else "bot-message-wrapper"
+    )
+    message_class = (
+        "user-message" if message["role"] == "user" else "bot-message"
+    )
+    content_html = message["content"].replace("\n", "<br>")
+    return f'<div class="{wrapper_class}"><div class="message {message_class}">{content_html}</div></div>'
+
+
+def render_messages():
+    # Messages are append-only, so only the ones added since the last rerun
+    # are converted; earlier HTML is reused from session_state.
+    rendered = st.session_state.rendered_count
+    for message in st.session_state.messages[rendered:]:
+        st.session_state.messages_html += message_html(message)
+    st.session_state.rendered_count = len(st.session_state.messages)
+    return f'<div class="message-container-div">{st.session_state.messages_html}</div>'
+
+
 # --------------------
 # Session State Initialization
 # --------------------
-if "messages" not in st.session_state:
-    st.session_state.messages = [
-        {
-            "role": "assistant",
-            "content": "Hello! 👋 What would you like to do today? You can choose an option below or type your question directly.",
-        }
-    ]
-if "mode" not in st.session_state:
-    st.session_state.mode = "menu"
+chat = Chat(engine, st.session_state)
+if "messages_html" not in st.session_state:
+    st.session_state.messages_html = ""
+    st.session_state.rendered_count = 0
 
 col1, col2 = st.columns([0.8, 1.2])
 
@@ -215,21 +221,9 @@ with col2:
     # Messages container
     message_container = st.container()
     with message_container:
-        messages_html = '<div class="message-container-div">'
-        for message in st.session_state.messages:
-            wrapper_class = (
-                "user-message-wrapper"
-                if message["role"] == "user"
-                else "bot-message-wrapper"
-            )
-            message_class = (
-                "user-message" if message["role"] == "user" else "bot-message"
-            )
-            content_html = message["content"].replace("\n", "<br>")
-            messages_html += f'<div class="{wrapper_class}"><div class="message {message_class}">{content_html}</div></div>'
-        messages_html += "</div>"
-
-        st.markdown(messages_html, unsafe_allow_html=True)
+        with span("render"):
+            messages_html = render_messages()
+            st.markdown(messages_html, unsafe_allow_html=True)
 
 
     # Input area
@@ -237,24 +231,12 @@ with col2:
     with input_container:
         st.markdown('<div class="input-area-wrapper">', unsafe_allow_html=True)
 
-        # Row tombol aksi (dua tombol sejajar, sama lebar)
-        btn_col1, btn_col2 = st.columns([1, 1])
-        if btn_col1.button("Check Ingredients 🥕", use_container_width=True):
-            st.session_state.mode = "waiting_ingredient"
-            st.session_state.messages.append({"role": "user", "content": "Check Ingredients"})
-            st.session_state.messages.append({
-                "role": "assistant",
-                "content": "Sure! What is the name of the recipe you want to check?",
-            })
-            st.rerun()
-        if btn_col2.button("Check Cooking Steps 📝", use_container_width=True):
-            st.session_state.mode = "waiting_direction"
-            st.session_state.messages.append({"role": "user", "content": "Check Cooking Steps"})
-            st.session_state.messages.append({
-                "role": "assistant",
-                "content": "Sure! What is the name of the recipe you want to check?",
-            })
-            st.rerun()
+        # Row tombol aksi (tiga tombol sejajar, sama lebar)
+        btn_cols = st.columns([1, 1, 1])
+        for col, mode, icon in zip(btn_cols, BUTTONS, ["🥕", "📝", "🧊"]):
+            if col.button(f"{BUTTONS[mode][0]} {icon}", use_container_width=True):
+                chat.press(mode)
+                st.rerun()
 
         # Row input (text box besar + tombol Send kecil)
         with st.form(key="chat_form", clear_on_submit=True):
@@ -267,189 +249,13 @@ with col2:
             submitted = form_col2.form_submit_button("Send", use_container_width=True)
 
             if submitted and prompt:
-                # Main Chat Logic
-                st.session_state.messages.append({"role": "user", "content": prompt})
-                user_lower = prompt.lower()
-                bot_reply = ""
-
-                # Mode tunggu input resep
-                if st.session_state.mode in ["waiting_ingredient", "waiting_direction"]:
-                    results = search_recipe_by_title(prompt, top_k=5)
-                    if results:
-                        first_recipe = results[0]
-                        st.session_state.last_results = results
-                        st.session_state.last_index = 0
-
-                        if st.session_state.mode == "waiting_ingredient":
-                            bot_reply = f"Here are the ingredients for **{first_recipe['title']}**:\n\n{format_list(first_recipe['ingredients'])}"
-                            st.session_state.mode_type = "ingredient"
-                        else:
-                            bot_reply = f"Here are the cooking steps for **{first_recipe['title']}**:\n\n{format_steps(first_recipe['directions'])}"
-                            st.session_state.mode_type = "step"
-
-                        st.session_state.messages.append(
-                            {"role": "assistant", "content": bot_reply}
-                        )
-                        st.session_state.messages.append(
-                            {
-                                "role": "assistant",
-                                "content": "Do you want to see another recipe? (yes/no)",
-                            }
-                        )
-                        st.session_state.mode = "ask_another"
-                    else:
-                        bot_reply = "Sorry, I couldn’t find that recipe. 😔 Please try another name."
-                        st.session_state.messages.append(
-                            {"role": "assistant", "content": bot_reply}
-                        )
-
-                # Mode yes/no
-                elif st.session_state.mode == "ask_another":
-                    if "yes" in user_lower:
-                        st.session_state.last_index += 1
-                        if st.session_state.last_index < len(
-                            st.session_state.last_results
-                        ):
-                            recipe = st.session_state.last_results[
-                                st.session_state.last_index
-                            ]
-                            if st.session_state.mode_type == "ingredient":
-                                bot_reply = f"Here are the ingredients for **{recipe['title']}**:\n\n{format_list(recipe['ingredients'])}"
-                            else:
-                                bot_reply = f"Here are the cooking steps for **{recipe['title']}**:\n\n{format_steps(recipe['directions'])}"
-                            st.session_state.messages.append(
-                                {"role": "assistant", "content": bot_reply}
-                            )
-                            st.session_state.messages.append(
-                                {
-                                    "role": "assistant",
-                                    "content": "Do you want to see another recipe? (yes/no)",
-                                }
-                            )
-                            st.session_state.mode = "ask_another"
-                        else:
-                            st.session_state.messages.append(
-                                {
-                                    "role": "assistant",
-                                    "content": "No more similar recipes found. 😔",
-                                }
-                            )
-                            st.session_state.mode = "menu"
-                    else:
-                        bot_reply = "Okay! You can type another recipe name anytime. 🍳"
-                        st.session_state.messages.append(
-                            {"role": "assistant", "content": bot_reply}
-                        )
-                        st.session_state.mode = "menu"
-
-                # Default small talk / smart reply
-                else:
-                    if "ingredient" in user_lower:
-                        results = search_recipe_by_title(
-                            user_lower.replace("ingredients for", "")
-                            .replace("ingredients", "")
-                            .strip(),
-                            top_k=5,
-                        )
-                        if results:
-                            first_recipe = results[0]
-                            st.session_state.last_results = results
-                            st.session_state.last_index = 0
-                            st.session_state.mode_type = "ingredient"
-                            st.session_state.mode = "ask_another"
-                            bot_reply = f"Here are the ingredients for **{first_recipe['title']}**:\n\n{format_list(first_recipe['ingredients'])}"
-                            st.session_state.messages.append(
-                                {"role": "assistant", "content": bot_reply}
-                            )
-                            st.session_state.messages.append(
-                                {
-                                    "role": "assistant",
-                                    "content": "Do you want to see another recipe? (yes/no)",
-                                }
-                            )
-                        else:
-                            bot_reply = "Sorry, I couldn’t find the ingredients for that recipe. 😔"
-                            st.session_state.mode = "waiting_ingredient"
-
-                    elif "step" in user_lower or "direction" in user_lower:
-                        results = search_recipe_by_title(
-                            user_lower.replace("steps for", "")
-                            .replace("directions for", "")
-                            .replace("steps", "")
-                            .replace("directions", "")
-                            .strip(),
-                            top_k=5,
-                        )
-                        if results:
-                            first_recipe = results[0]
-                            st.session_state.last_results = results
-                            st.session_state.last_index = 0
-                            st.session_state.mode_type = "step"
-                            st.session_state.mode = "ask_another"
-                            bot_reply = f"Here are the cooking steps for **{first_recipe['title']}**:\n\n{format_steps(first_recipe['directions'])}"
-                            st.session_state.messages.append(
-                                {"role": "assistant", "content": bot_reply}
-                            )
-                            st.session_state.messages.append(
-                                {
-                                    "role": "assistant",
-                                    "content": "Do you want to see another recipe? (yes/no)",
-                                }
-                            )
-                        else:
-                            bot_reply = "Sorry, I couldn’t find the cooking steps for that recipe. 😔"
-                            st.session_state.mode = "waiting_direction"
-                    else:
-                        # Small talk
-                        if "hello" in user_lower or "hi" in user_lower or "hai" in user_lower or "hey" in user_lower:
-                            bot_reply = "Hi there! 😊 How can I help you with your cooking today?"
-                        elif "thank" in user_lower:
-                            bot_reply = "You're welcome! Let me know if you need anything else. 🍀"
-                        elif "how to" in user_lower or "make" in user_lower:
-                            results = search_recipe_by_title(user_lower.replace("how to", "").replace("make", "").strip(), top_k=5)
-                            if results:
-                                first_recipe = results[0]
-                                st.session_state.last_results = results
-                                st.session_state.last_index = 0
-                                bot_reply = f"To make **{first_recipe['title']}**, you have to prepare these ingredients:\n\n{format_list(first_recipe['ingredients'])}\n\nAfter preparing the ingredients, you can follow these cooking steps:\n\n{format_steps(first_recipe['directions'])}"
-                                st.session_state.messages.append({"role": "assistant", "content": bot_reply})
-                                st.session_state.messages.append({"role": "assistant", "content": "Do you want to see another recipe? (yes/no)"})
-                                st.session_state.mode = "ask_another"
-                            else:
-                                bot_reply = "Sorry, I couldn’t find that recipe. 😔"
-                                st.session_state.messages.append({"role": "assistant", "content": bot_reply})
-                                st.session_state.mode = "waiting_direction"
-                        elif "ingredient" in user_lower:
-                            results = search_recipe_by_title(user_lower.replace("ingredients for", "").replace("ingredients", "").strip(), top_k=5)
-                            if results:
-                                first_recipe = results[0]
-                                st.session_state.last_results = results
-                                st.session_state.last_index = 0
-                                bot_reply = f"Here are the ingredients for **{first_recipe['title']}**:\n\n{format_list(first_recipe['ingredients'])}"
-                                st.session_state.messages.append({"role": "assistant", "content": "Do you want to see another recipe? (yes/no)"})
-                                st.session_state.mode = "ask_another"
-                            else:
-                                bot_reply = "Sorry, I couldn’t find the ingredients for that recipe. 😔"
-                                st.session_state.mode = "waiting_ingredient"
-                                st.session_state.messages.append({"role": "assistant", "content": bot_reply})
-                        elif "step" in user_lower or "direction" in user_lower:
-                            results = search_recipe_by_title(user_lower.replace("steps for", "").replace("directions for", "").replace("steps", "").replace("directions", "").strip(), top_k=5)
-                            if results:
-                                first_recipe = results[0]
-                                st.session_state.last_results = results
-                                st.session_state.last_index = 0
-                                bot_reply = f"Here are the directions for **{first_recipe['title']}**:\n\n{format_steps(first_recipe['directions'])}"
-                                st.session_state.messages.append({"role": "assistant", "content": "Do you want to see another recipe? (yes/no)"})
-                                st.session_state.mode = "ask_another"
-                            else:
-                                bot_reply = "Sorry, I couldn’t find the cooking steps for that recipe. 😔"
-                                st.session_state.mode = "waiting_direction"
-                                st.session_state.messages.append({"role": "assistant", "content": bot_reply})
-                        else:
-                            bot_reply = "I can help you with ingredients or cooking steps. Just mention the recipe name. 🍳"
-                        st.session_state.messages.append(
-                            {"role": "assistant", "content": bot_reply}
-                        )
+                # Routing plus search and formatting for this turn.
+                with span("reply"):
+                    chat.handle_message(prompt)
                 st.rerun()
         st.markdown("</div>", unsafe_allow_html=True)
     auto_scroll()
+
+if METRICS.sampled():
+    METRICS.observe("rerun", time.perf_counter() - run_started)
+METRICS.maybe_write_json(os.environ.get("RECIPE_METRICS_PATH"))
@@ -0,0 +1,126 @@
+"""Recall-vs-latency benchmark for the FAISS index backends.
+
+Example:
+    python benchmarks/bench_ann.py --embeddings build/embeddings.f32 --dim 384
+    python benchmarks/bench_ann.py --synthetic 200000 --nlist 1024
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import faiss
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from index_backends import index_nbytes, make_index, set_search_params  # noqa: E402
+
+
+def load_vectors(args):
+    if args.embeddings:
+        data = np.fromfile(args.embeddings, dtype="float32")
+        return data.reshape(-1, args.dim)
+    if args.index:
+        index = faiss.read_index(args.index)
+        return index.reconstruct_n(0, index.ntotal)
+    rng = np.random.default_rng(args.seed)
+    return rng.standard_normal((args.synthetic, args.dim)).astype("float32")
+
+
+def make_queries(vectors, nq, seed):
+    # Perturbed database vectors stand in for real query embeddings.
+    rng = np.random.default_rng(seed)
+    picked = vectors[rng.choice(len(vectors), nq, replace=False)]
+    noise = rng.standard_normal(picked.shape).astype("float32") * 0.05
+    return np.ascontiguousarray(picked + noise)
+
+
+def time_queries(index, queries, k):
+    latencies = []
+    ids = np.empty((len(queries), k), dtype="int64")
+    for i in range(len(queries)):
+        start = time.perf_counter()
+        _, I = index.search(queries[i : i + 1], k)
+        latencies.append(time.perf_counter() - start)
+        ids[i] = I[0]
+    latencies = np.array(latencies) * 1000
+    return ids, float(np.percentile(latencies, 50)), float(np.percentile(latencies, 99))
+
+
+def recall_at_k(ids, truth):
+    hits = [len(set(a) & set(b)) for a, b in zip(ids.tolist(), truth.tolist())]
+    return float(np.mean(hits)) / truth.shape[1]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--embeddings", help="raw float32 file from build_index.py")
+    source.add_argument("--index", help="flat FAISS index to reconstruct vectors from")
+    source.add_argument("--synthetic", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--nlist", type=int, default=1024)
+    parser.add_argument("--pq-m", type=int, default=16)
+    parser.add_argument("--hnsw-m", type=int, default=32)
+    parser.add_argument("--train-size", type=int, default=200000)
+    parser.add_argument("--nprobe", default="1,4,16,64")
+    parser.add_argument("--ef-search", default="16,32,64,128")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args(argv)
+
+    vectors = np.ascontiguousarray(load_vectors(args), dtype="float32")
+    queries = make_queries(vectors, args.queries, args.seed)
+    dim = vectors.shape[1]
+    rng = np.random.default_rng(args.seed)
+    train = vectors[rng.choice(len(vectors), min(args.train_size, len(vectors)), replace=False)]
+
+    configs = [("flat", {})]
+    configs += [("ivf_flat", {"nprobe": int(v)}) for v in args.nprobe.split(",")]
+    configs += [("ivf_pq", {"nprobe": int(v)}) for v in args.nprobe.split(",")]
+    configs += [("hnsw", {"ef_search": int(v)}) for v in args.ef_search.split(",")]
+
+    built = {}
+    truth = None
+    results = []
+    print(f"{len(vectors)} vectors, dim {dim}, {len(queries)} queries, k={args.k}")
+    print(f"{'index':<10}{'param':<16}{'recall':>8}{'p50 ms':>10}{'p99 ms':>10}{'MB':>10}{'build s':>10}")
+    for index_type, params in configs:
+        if index_type not in built:
+            start = time.perf_counter()
+            index = make_index(index_type, dim, nlist=args.nlist, pq_m=args.pq_m, hnsw_m=args.hnsw_m)
+            if not index.is_trained:
+                index.train(train)
+            index.add(vectors)
+            built[index_type] = (index, time.perf_counter() - start)
+        index, build_seconds = built[index_type]
+        set_search_params(index, **params)
+        ids, p50, p99 = time_queries(index, queries, args.k)
+        if truth is None:
+            truth = ids
+        row = {
+            "index": index_type,
+            "params": params,
+            "recall_at_k": recall_at_k(ids, truth),
+            "p50_ms": p50,
+            "p99_ms": p99,
+            "memory_mb": index_nbytes(index) / 1e6,
+            "build_s": build_seconds,
+        }
+        results.append(row)
+        param_str = ",".join(f"{k}={v}" for k, v in params.items()) or "-"
+        print(
+            f"{index_type:<10}{param_str:<16}{row['recall_at_k']:>8.3f}{p50:>10.3f}"
+            f"{p99:>10.3f}{row['memory_mb']:>10.1f}{build_seconds:>10.1f}"
+        )
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"k": args.k, "n": len(vectors), "dim": dim, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""Latency benchmark for BM25 search on a large synthetic lexical index.
+
+Term document frequencies follow a Zipf curve, so the first terms appear in
+most recipes like "salt" or "butter" do. Every query is timed with
+LexicalIndex.search and with the previous implementation, which merged all
+posting lists with np.unique; overlap is the share of its top k that the
+current search also returns.
+
+Example:
+    python benchmarks/bench_lexical.py --docs 2000000 --terms 20000
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from lexical_index import LexicalIndex  # noqa: E402
+
+
+def synthetic_index(path, n_docs, n_terms, head, seed):
+    # Writes the files build_lexical_index would, for term names t0, t1, ...
+    rng = np.random.default_rng(seed)
+    postings = []
+    for rank in range(1, n_terms + 1):
+        df = max(1, int(n_docs * head / rank))
+        postings.append(np.unique(rng.integers(0, n_docs, df)).astype("int32"))
+    term_ptr = np.zeros(n_terms + 1, dtype="int64")
+    np.cumsum([len(p) for p in postings], out=term_ptr[1:])
+    doc_ids = np.concatenate(postings)
+    tfs = rng.integers(1, 4, len(doc_ids)).astype("uint16")
+    doc_len = np.bincount(doc_ids, weights=tfs, minlength=n_docs).astype("uint16")
+
+    os.makedirs(path, exist_ok=True)
+    np.save(os.path.join(path, "term_ptr.npy"), term_ptr)
+    np.save(os.path.join(path, "doc_ids.npy"), doc_ids)
+    np.save(os.path.join(path, "tfs.npy"), tfs)
+    np.save(os.path.join(path, "doc_len.npy"), doc_len)
+    np.save(os.path.join(path, "title_hashes.npy"), np.empty(0, dtype="uint64"))
+    np.save(os.path.join(path, "title_ids.npy"), np.empty(0, dtype="int32"))
+    with open(os.path.join(path, "vocab.txt"), "w", encoding="utf-8") as f:
+        f.write("\n".join(f"t{i}" for i in range(n_terms)))
+    return len(doc_ids)
+
+
+def make_queries(n_terms, nq, seed):
+    # A common term plus one or two rarer ones: "chicken with salt and thyme".
+    rng = np.random.default_rng(seed)
+    queries = []
+    for _ in range(nq):
+        terms = [int(rng.integers(0, 10))]
+        terms += rng.integers(0, n_terms, int(rng.integers(1, 3))).tolist()
+        queries.append(" ".join(f"t{t}" for t in terms))
+    return queries
+
+
+def legacy_search(index, query, top_k):
+    # index is built with min_idf=0, so no term is skipped.
+    ids, scores = [], []
+    for idf, start, end in index._terms(query):
+        docs, term_scores = index._scores(idf, start, end)
+        ids.append(docs)
+        scores.append(term_scores)
+    unique, inverse = np.unique(np.concatenate(ids), return_inverse=True)
+    totals = np.bincount(inverse, weights=np.concatenate(scores))
+    top = np.argpartition(-totals, top_k)[:top_k] if len(unique) > top_k else np.arange(len(unique))
+    top = top[np.argsort(-totals[top], kind="stable")]
+    return unique[top]
+
+
+def time_queries(search, queries, k):
+    latencies, results = [], []
+    for query in queries:
+        start = time.perf_counter()
+        results.append(search(query, k))
+        latencies.append(time.perf_counter() - start)
+    latencies = np.array(latencies) * 1000
+    return results, float(np.percentile(latencies, 50)), float(np.percentile(latencies, 99))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--docs", type=int, default=1000000)
+    parser.add_argument("--terms", type=int, default=10000)
+    parser.add_argument("--head", type=float, default=0.9, help="share of recipes with the most common term")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as path:
+        start = time.perf_counter()
+        n_postings = synthetic_index(path, args.docs, args.terms, args.head, args.seed)
+        build_seconds = time.perf_counter() - start
+        index = LexicalIndex(path)
+        exhaustive = LexicalIndex(path, min_idf=0.0)
+        queries = make_queries(args.terms, args.queries, args.seed)
+
+        current, p50, p99 = time_queries(lambda q, k: index.search(q, k)[0], queries, args.k)
+        legacy, legacy_p50, legacy_p99 = time_queries(lambda q, k: legacy_search(exhaustive, q, k), queries, args.k)
+        overlap = float(np.mean([len(set(a) & set(b)) / max(len(b), 1) for a, b in zip(current, legacy)]))
+
+    print(f"{args.docs} docs, {args.terms} terms, {n_postings} postings ({build_seconds:.1f}s to build)")
+    print(f"{'search':<10}{'p50 ms':>10}{'p99 ms':>10}")
+    print(f"{'np.unique':<10}{legacy_p50:>10.2f}{legacy_p99:>10.2f}")
+    print(f"{'current':<10}{p50:>10.2f}{p99:>10.2f}")
+    print(f"top-{args.k} overlap with np.unique: {overlap:.3f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(
+                {
+                    "docs": args.docs,
+                    "terms": args.terms,
+                    "postings": n_postings,
+                    "k": args.k,
+                    "legacy_p50_ms": legacy_p50,
+                    "legacy_p99_ms": legacy_p99,
+                    "p50_ms": p50,
+                    "p99_ms": p99,
+                    "overlap": overlap,
+                },
+                f,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()
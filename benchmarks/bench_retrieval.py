@@ -0,0 +1,356 @@
+"""End-to-end retrieval benchmark with JSON baselines.
+
+Replays dish names and ingredient phrases through RecipeEngine.search_ids,
+the same path the app and service use, and reports latency percentiles,
+throughput, peak RSS and recall@k / MRR against the recipe each query was
+made from. Runs offline: the default hashing encoder needs no model, or pass
+a locally cached sentence-transformers model with --encoder.
+
+Example:
+    python benchmarks/bench_retrieval.py --save-baseline benchmarks/baseline.json
+    python benchmarks/bench_retrieval.py --baseline benchmarks/baseline.json
+    python benchmarks/bench_retrieval.py --artifacts . --encoder sentence-transformers/all-MiniLM-L6-v2
+
+Without --artifacts, the dataset is indexed into a temporary directory with
+build_index.py, so --index-type and --max-distance can be compared directly.
+With --baseline, the exit status is 1 if any metric regressed beyond its
+tolerance. Without it, recall and MRR are checked against the committed
+benchmarks/quality_baseline.json whenever the corpus and query set match;
+refresh that file with --save-baseline when a quality change is intended.
+"""
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import os
+import re
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import build_index  # noqa: E402
+from engine import RecipeEngine  # noqa: E402
+from index_backends import INDEX_TYPES  # noqa: E402
+from lexical_index import title_key  # noqa: E402
+from retrieval import MAX_DISTANCE  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_WORD = re.compile(r"[a-z0-9]+")
+
+# metric -> (direction, default tolerance); "lower" means smaller is better.
+# Latency tolerances are relative, quality tolerances absolute.
+CHECKS = {
+    "p50_ms": ("lower", 0.25),
+    "p95_ms": ("lower", 0.25),
+    "p99_ms": ("lower", 0.50),
+    "throughput_qps": ("higher", 0.20),
+    "peak_rss_mb": ("lower", 0.20),
+    "recall_at_k": ("higher", 0.01),
+    "mrr": ("higher", 0.01),
+    "semantic_recall_at_k": ("higher", 0.01),
+    "semantic_mrr": ("higher", 0.01),
+}
+QUALITY = {"recall_at_k", "mrr", "semantic_recall_at_k", "semantic_mrr"}
+# Checked on every run whose corpus and query set match the ones it was
+# saved with; latency depends on the machine, so only quality is compared.
+QUALITY_BASELINE = os.path.join(ROOT, "benchmarks", "quality_baseline.json")
+QUALITY_CONFIG = ["dataset", "recipes", "encoder", "backend", "k", "queries"]
+
+
+class HashingEncoder:
+    # Offline stand-in for MiniLM: a signed bag of hashed words and bigrams.
+    # Not semantic, but shared words still land close together, so quality
+    # numbers stay meaningful for comparing thresholds and index types.
+    def __init__(self, dim=384):
+        self.dim = dim
+
+    def get_sentence_embedding_dimension(self):
+        return self.dim
+
+    def encode(self, sentences, batch_size=32, convert_to_numpy=True, **kwargs):
+        out = np.zeros((len(sentences), self.dim), dtype="float32")
+        for row, text in enumerate(sentences):
+            words = _WORD.findall(text.lower())
+            for feature in words + [a + " " + b for a, b in zip(words, words[1:])]:
+                h = int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), "little")
+                out[row, h % self.dim] += 1.0 if h >> 63 else -1.0
+            norm = np.linalg.norm(out[row])
+            if norm:
+                out[row] /= norm
+        return out
+
+
+def load_encoder(args):
+    if args.encoder == "hash":
+        return HashingEncoder(args.dim)
+    from engine import load_model
+
+    return load_model(args.encoder, args.backend)
+
+
+def build_artifacts(args, encoder, out):
+    argv = [args.dataset, "--out", out, "--index-type", args.index_type,
+            "--nlist", str(args.nlist), "--no-ingredients", "--no-cards"]
+    if args.limit:
+        argv += ["--limit", str(args.limit)]
+    if args.no_lexical:
+        argv.append("--no-lexical")
+    with contextlib.redirect_stdout(io.StringIO()):
+        build_index.main(argv, model=encoder)
+
+
+def make_queries(store, n, seed):
+    # (kind, query, ids of the recipes that count as correct answers)
+    live = [idx for idx in range(len(store)) if not store.is_deleted(idx)]
+    by_title = {}
+    for idx in live:
+        by_title.setdefault(title_key(store[idx]["title"]), set()).add(idx)
+
+    rng = np.random.default_rng(seed)
+    picked = rng.choice(live, min(n, len(live)), replace=False)
+    queries = []
+    for idx in picked.tolist():
+        title = store[idx]["title"]
+        same = by_title[title_key(title)]
+        # Exact titles are answered by the lexical fast path without touching
+        # the encoder or FAISS, so every query here is something else.
+        words = title_key(title).split()
+        if len(words) > 2:
+            words.pop(int(rng.integers(len(words))))
+        else:
+            words.reverse()
+        partial = " ".join(words)
+        if partial not in by_title:
+            queries.append(("partial_title", partial, same))
+        dish = re.sub(r"\b(recipe|recipes)\b|\(.*?\)", " ", title.lower())
+        dish = " ".join(dish.split())
+        if dish and dish != partial and title_key(dish) not in by_title:
+            queries.append(("dish", dish, same))
+        ner = [x.strip() for x in store[idx]["NER"].split(",") if x.strip()]
+        if ner:
+            picks = rng.choice(len(ner), min(3, len(ner)), replace=False)
+            items = [ner[i] for i in sorted(picks)]
+            queries.append(("ingredients", "something with " + " and ".join(items), {idx}))
+    return queries
+
+
+def percentile_ms(seconds, q):
+    return float(np.percentile(np.asarray(seconds) * 1000, q)) if seconds else 0.0
+
+
+def peak_rss_mb():
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return rss / 1e6 if sys.platform == "darwin" else rss / 1e3
+
+
+def run(engine, queries, k, concurrency):
+    def one(query):
+        start = time.perf_counter()
+        ids = engine.search_ids(query[1], k)
+        return time.perf_counter() - start, ids
+
+    engine.query_cache.clear()
+    if engine.answer_cache is not None:
+        engine.answer_cache.clear(engine.artifacts.version)
+    started = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(concurrency) as pool:
+            timed = list(pool.map(one, queries))
+    else:
+        timed = [one(q) for q in queries]
+    wall = time.perf_counter() - started
+
+    latencies = [t for t, _ in timed]
+    ranks = []
+    for (_, _, relevant), (_, ids) in zip(queries, timed):
+        rank = next((r for r, i in enumerate(ids, 1) if i in relevant), None)
+        ranks.append(rank)
+    return latencies, ranks, wall
+
+
+def quality(ranks, prefix=""):
+    return {
+        prefix + "recall_at_k": float(np.mean([r is not None for r in ranks])) if ranks else 0.0,
+        prefix + "mrr": float(np.mean([1.0 / r if r else 0.0 for r in ranks])) if ranks else 0.0,
+    }
+
+
+def semantic_ranks(engine, queries, k, ranks):
+    # On a small corpus BM25 alone finds nearly every answer and hides the
+    # effect of --max-distance / --index-type, so also score FAISS alone.
+    lexical = engine.artifacts.lexical
+    if lexical is None:
+        return ranks
+    engine.artifacts.lexical = None
+    try:
+        return run(engine, queries, k, 1)[1]
+    finally:
+        engine.artifacts.lexical = lexical
+
+
+def config_changes(report, baseline):
+    # Not failures by themselves: comparing a new threshold or index type
+    # against the old baseline is the point, but the reader should know.
+    return [
+        f"{key}: {baseline['config'].get(key)!r} -> {value!r}"
+        for key, value in report["config"].items()
+        if key != "rounds" and baseline["config"].get(key) != value
+    ]
+
+
+def compare(report, baseline, tolerances, metrics=CHECKS):
+    failures = []
+    for metric in metrics:
+        direction = CHECKS[metric][0]
+        old, new = baseline["metrics"][metric], report["metrics"][metric]
+        tol = tolerances[metric]
+        if metric in QUALITY:
+            worse = new < old - tol
+        elif direction == "lower":
+            worse = new > old * (1 + tol)
+        else:
+            worse = new < old * (1 - tol)
+        if worse:
+            failures.append(f"{metric}: {old:.4g} -> {new:.4g} (tolerance {tol})")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dataset", default=os.path.join(ROOT, "sample_dataset.csv"))
+    parser.add_argument("--limit", type=int, default=0, help="index only the first N rows")
+    parser.add_argument("--artifacts", help="benchmark an existing build instead of the dataset")
+    parser.add_argument("--encoder", default="hash", help="'hash' or a locally cached model name")
+    parser.add_argument("--backend", help="encoder backend, see encoder_backends.py")
+    parser.add_argument("--dim", type=int, default=384, help="hashing encoder dimension")
+    parser.add_argument("--index-type", choices=INDEX_TYPES, default="flat")
+    parser.add_argument("--nlist", type=int, default=64)
+    parser.add_argument("--no-lexical", action="store_true", help="vector search only")
+    parser.add_argument("--max-distance", type=float, default=MAX_DISTANCE)
+    parser.add_argument("--queries", type=int, default=500, help="recipes to derive queries from")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--rounds", type=int, default=3, help="measured passes over the query set")
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="write the report to this file")
+    parser.add_argument("--save-baseline", help="write the report as a baseline")
+    parser.add_argument("--baseline", help="fail if results regressed against this baseline")
+    parser.add_argument(
+        "--quality-baseline",
+        default=QUALITY_BASELINE,
+        help="committed recall/MRR baseline checked when --baseline is not given ('' to skip)",
+    )
+    for metric, (_, tol) in CHECKS.items():
+        parser.add_argument(f"--tol-{metric.replace('_', '-')}", type=float, default=tol)
+    args = parser.parse_args(argv)
+
+    encoder = load_encoder(args)
+    with tempfile.TemporaryDirectory() as tmp:
+        artifacts = args.artifacts
+        if artifacts is None:
+            start = time.perf_counter()
+            build_artifacts(args, encoder, tmp)
+            build_s = time.perf_counter() - start
+            artifacts = tmp
+        engine = RecipeEngine(artifacts, model=encoder)
+        engine.max_distance = args.max_distance
+        if args.no_lexical:
+            engine.artifacts.lexical = None
+
+        queries = make_queries(engine.store, args.queries, args.seed)
+        run(engine, queries[: min(50, len(queries))], args.k, 1)  # warm up
+        latencies, walls = [], 0.0
+        for _ in range(args.rounds):
+            times, ranks, wall = run(engine, queries, args.k, args.concurrency)
+            latencies += times
+            walls += wall
+        vector_ranks = semantic_ranks(engine, queries, args.k, ranks)
+        engine.encoder.close()
+
+    kinds = sorted({kind for kind, _, _ in queries})
+    report = {
+        "config": {
+            "dataset": os.path.basename(args.dataset) if not args.artifacts else args.artifacts,
+            "recipes": len(engine.store),
+            "encoder": args.encoder,
+            "backend": args.backend,
+            "index_type": args.index_type if not args.artifacts else "existing",
+            "lexical": engine.lexical is not None,
+            "max_distance": args.max_distance,
+            "k": args.k,
+            "queries": len(queries),
+            "rounds": args.rounds,
+            "concurrency": args.concurrency,
+        },
+        "metrics": {
+            "p50_ms": percentile_ms(latencies, 50),
+            "p95_ms": percentile_ms(latencies, 95),
+            "p99_ms": percentile_ms(latencies, 99),
+            "throughput_qps": len(latencies) / walls if walls else 0.0,
+            "peak_rss_mb": peak_rss_mb(),
+            **quality(ranks),
+            **quality(vector_ranks, "semantic_"),
+        },
+        "by_kind": {
+            kind: quality([r for (k, _, _), r in zip(queries, ranks) if k == kind])
+            for kind in kinds
+        },
+    }
+    if not args.artifacts:
+        report["metrics"]["build_s"] = build_s
+
+    m = report["metrics"]
+    print(
+        f"{report['config']['recipes']} recipes, {len(queries)} queries x {args.rounds}, "
+        f"k={args.k}, encoder={args.encoder}, index={report['config']['index_type']}"
+    )
+    print(
+        f"latency p50 {m['p50_ms']:.2f} ms  p95 {m['p95_ms']:.2f} ms  p99 {m['p99_ms']:.2f} ms  "
+        f"throughput {m['throughput_qps']:.0f} q/s  peak RSS {m['peak_rss_mb']:.0f} MB"
+    )
+    print(
+        f"recall@{args.k} {m['recall_at_k']:.3f}  MRR {m['mrr']:.3f}  "
+        f"(FAISS alone: recall@{args.k} {m['semantic_recall_at_k']:.3f}  MRR {m['semantic_mrr']:.3f})"
+    )
+    for kind, q in report["by_kind"].items():
+        print(f"  {kind:<12} recall@{args.k} {q['recall_at_k']:.3f}  MRR {q['mrr']:.3f}")
+
+    for path in [args.json, args.save_baseline]:
+        if path:
+            with open(path, "w") as f:
+                json.dump(report, f, indent=2)
+
+    tolerances = {m: getattr(args, "tol_" + m) for m in CHECKS}
+    baseline_path, metrics = args.baseline, CHECKS
+    if not baseline_path and args.quality_baseline and os.path.exists(args.quality_baseline):
+        baseline_path, metrics = args.quality_baseline, QUALITY
+    if not baseline_path:
+        return 0
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    if metrics is QUALITY and any(
+        baseline["config"].get(key) != report["config"][key] for key in QUALITY_CONFIG
+    ):
+        print(f"not comparable with {baseline_path} (different corpus or query set)")
+        return 0
+    for change in config_changes(report, baseline):
+        print("config differs from baseline, " + change)
+    failures = compare(report, baseline, tolerances, metrics)
+    if failures:
+        print("REGRESSION against " + baseline_path, file=sys.stderr)
+        for failure in failures:
+            print("  " + failure, file=sys.stderr)
+        return 1
+    print(f"no regression against {baseline_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,150 @@
+"""Intent router throughput, plus a routing check of the README conversation.
+
+Example:
+    python benchmarks/bench_router.py
+    python benchmarks/bench_router.py --extra-intents 0,100,500 --messages 20000
+
+Each README turn is routed first, with the mode the app was in at that point,
+and the script exits 1 if any is routed differently (the replies themselves
+are tested in tests/test_chat.py). Throughput is then
+measured for the real intent table and for tables padded with synthetic
+intents, to show how routing cost grows as intents are added.
+"""
+import argparse
+import json
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from intent_router import INTENTS, IntentRouter  # noqa: E402
+
+# (mode before the message, message, expected intent, expected query)
+TRANSCRIPT = [
+    ("waiting_ingredient", "fried rice", "ingredients", "fried rice"),
+    ("ask_another", "yes", "yes", ""),
+    ("ask_another", "no", "no", ""),
+    ("waiting_direction", "meatball", "steps", "meatball"),
+    ("ask_another", "yes", "yes", ""),
+    ("ask_another", "no", "no", ""),
+    ("menu", "thank you", "thanks", ""),
+    ("menu", "i want to make salad", "how_to", "salad"),
+    ("ask_another", "no", "no", ""),
+    ("menu", "give me pizza ingredients", "ingredients", "pizza"),
+    ("ask_another", "yes", "yes", ""),
+    ("ask_another", "no", "no", ""),
+    ("menu", "hello", "greeting", ""),
+    # Cases the old substring cascade (or an earlier version of the router) got wrong.
+    ("menu", "how to make chicken curry", "how_to", "chicken curry"),
+    ("menu", "steps for Shrimp Scampi", "steps", "shrimp scampi"),
+    ("menu", "I have eggs, rice and peas", "fridge", "I have eggs, rice and peas"),
+    ("menu", "ingredients", "ingredients", ""),
+    ("ask_another", "okay no more", "no", ""),
+    ("waiting_ingredient", "a la king chicken", "ingredients", "a la king chicken"),
+    ("menu", "what are the steps to make pancakes", "steps", "pancakes"),
+    ("menu", "how to make fridge cake", "how_to", "fridge cake"),
+    ("menu", "steps for fridge cake", "steps", "fridge cake"),
+    ("menu", "what ingredients do i have to buy for lasagna", "ingredients", "what do i have to buy for lasagna"),
+    ("menu", "I have a question: how to make pizza", "how_to", "pizza"),
+    ("menu", "I have chicken and rice, what can I make?", "fridge", "I have chicken and rice, what can I make?"),
+]
+
+MESSAGES = [
+    "fried rice", "yes", "no", "thank you", "hello", "i want to make salad",
+    "give me pizza ingredients", "steps for chocolate chip cookies",
+    "what are the ingredients for banana bread please", "how to make pancakes",
+    "what can i cook with chicken and rice", "show me the cooking steps of lasagna",
+    "hi there, can you tell me how to make a creamy mushroom risotto with parmesan",
+    "spaghetti aglio e olio",
+]
+
+
+def legacy_route(text):
+    # The substring cascade app.py used before intent_router.py, for comparison.
+    user_lower = text.lower()
+    if "what can i cook" in user_lower or "i have" in user_lower or "fridge" in user_lower:
+        return "fridge", text
+    if "ingredient" in user_lower:
+        return "ingredients", user_lower.replace("ingredients for", "").replace("ingredients", "").strip()
+    if "step" in user_lower or "direction" in user_lower:
+        return "steps", (
+            user_lower.replace("steps for", "").replace("directions for", "")
+            .replace("steps", "").replace("directions", "").strip()
+        )
+    if "hello" in user_lower or "hi" in user_lower or "hai" in user_lower or "hey" in user_lower:
+        return "greeting", ""
+    if "thank" in user_lower:
+        return "thanks", ""
+    if "how to" in user_lower or "make" in user_lower:
+        return "how_to", user_lower.replace("how to", "").replace("make", "").strip()
+    return "help", ""
+
+
+def check_transcript(router):
+    failures = []
+    for mode, message, intent, query in TRANSCRIPT:
+        got = router.route(message, mode)
+        if got != (intent, query):
+            failures.append(f"{mode:<20}{message!r}: expected {(intent, query)}, got {got}")
+    return failures
+
+
+def synthetic_intents(n, seed):
+    rng = random.Random(seed)
+    intents = []
+    for i in range(n):
+        phrases = [" ".join("".join(rng.choices(string.ascii_lowercase, k=7)) for _ in range(rng.randint(1, 3)))
+                   for _ in range(3)]
+        intents.append((f"extra_{i}", phrases, True))
+    return intents
+
+
+def throughput(fn, messages):
+    started = time.perf_counter()
+    for message in messages:
+        fn(message)
+    elapsed = time.perf_counter() - started
+    return len(messages) / elapsed, elapsed / len(messages) * 1e6
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=50000)
+    parser.add_argument("--extra-intents", default="0,100,1000")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args(argv)
+
+    failures = check_transcript(IntentRouter(INTENTS))
+    if failures:
+        print("transcript routing FAILED:", file=sys.stderr)
+        for failure in failures:
+            print("  " + failure, file=sys.stderr)
+        return 1
+    print(f"transcript: {len(TRANSCRIPT)} turns routed as expected")
+
+    rng = random.Random(args.seed)
+    messages = [rng.choice(MESSAGES) for _ in range(args.messages)]
+    results = []
+    qps, us = throughput(legacy_route, messages)
+    results.append({"router": "legacy cascade", "intents": 6, "msgs_per_s": qps, "us_per_msg": us})
+    for extra in [int(n) for n in args.extra_intents.split(",")]:
+        router = IntentRouter(INTENTS + synthetic_intents(extra, args.seed))
+        qps, us = throughput(router.route, messages)
+        results.append(
+            {"router": "keyword table", "intents": len(INTENTS) + extra, "msgs_per_s": qps, "us_per_msg": us}
+        )
+
+    print(f"{'router':<16}{'intents':>8}{'msgs/s':>12}{'us/msg':>9}")
+    for row in results:
+        print(f"{row['router']:<16}{row['intents']:>8}{row['msgs_per_s']:>12.0f}{row['us_per_msg']:>9.2f}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+"""Throughput of sharded flat search vs. shard and worker counts.
+
+Example:
+    python benchmarks/bench_shards.py --synthetic 1000000 --shards 1,2,4,8 --workers 0,2,4,8
+    python benchmarks/bench_shards.py --embeddings build/embeddings.f32 --dim 384
+
+Every configuration is checked against a single IndexFlatL2 over the same
+vectors; "match" is the share of queries whose top-k ids are identical.
+workers=0 searches the shards one after another in the calling process.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import faiss
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sharded_index import ShardedIndex, write_shards  # noqa: E402
+
+
+def load_vectors(args):
+    if args.embeddings:
+        return np.fromfile(args.embeddings, dtype="float32").reshape(-1, args.dim)
+    rng = np.random.default_rng(args.seed)
+    return rng.standard_normal((args.synthetic, args.dim)).astype("float32")
+
+
+def time_batches(index, queries, k, batch):
+    latencies = []
+    ids = []
+    started = time.perf_counter()
+    for start in range(0, len(queries), batch):
+        t0 = time.perf_counter()
+        _, I = index.search(queries[start : start + batch], k)
+        latencies.append(time.perf_counter() - t0)
+        ids.append(I)
+    wall = time.perf_counter() - started
+    latencies = np.asarray(latencies) * 1000
+    return np.concatenate(ids), len(queries) / wall, float(np.percentile(latencies, 50))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--embeddings", help="raw float32 file from build_index.py")
+    source.add_argument("--synthetic", type=int, default=200000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=512)
+    parser.add_argument("--batch", type=int, default=32, help="queries per search call")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--shards", default="1,2,4,8")
+    parser.add_argument("--workers", default="0,1,2,4,8")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args(argv)
+
+    vectors = np.ascontiguousarray(load_vectors(args))
+    rng = np.random.default_rng(args.seed)
+    queries = vectors[rng.choice(len(vectors), args.queries, replace=False)]
+    queries = queries + rng.standard_normal(queries.shape).astype("float32") * 0.05
+
+    flat = faiss.IndexFlatL2(vectors.shape[1])
+    flat.add(vectors)
+    truth, base_qps, base_p50 = time_batches(flat, queries, args.k, args.batch)
+    print(f"{len(vectors)} vectors, dim {vectors.shape[1]}, {args.queries} queries, "
+          f"batch {args.batch}, k={args.k}, {os.cpu_count()} CPUs")
+    print(f"{'shards':>7}{'workers':>9}{'q/s':>10}{'speedup':>9}{'p50 ms':>10}{'match':>8}")
+    print(f"{'flat':>7}{'-':>9}{base_qps:>10.0f}{1.0:>9.2f}{base_p50:>10.2f}{1.0:>8.3f}")
+
+    results = [{"shards": 0, "workers": 0, "qps": base_qps, "p50_ms": base_p50, "match": 1.0}]
+    ids = np.arange(len(vectors), dtype="int64")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_shards in [int(s) for s in args.shards.split(",")]:
+            path = os.path.join(tmp, f"shards_{n_shards}")
+            write_shards(vectors, ids, path, n_shards)
+            for workers in [int(w) for w in args.workers.split(",")]:
+                if workers > n_shards:
+                    continue
+                index = ShardedIndex(path, workers=workers)
+                index.search(queries[: args.batch], args.k)  # start workers, fault in pages
+                found, qps, p50 = time_batches(index, queries, args.k, args.batch)
+                index.close()
+                match = float(np.mean(np.all(found == truth, axis=1)))
+                row = {"shards": n_shards, "workers": workers, "qps": qps, "p50_ms": p50, "match": match}
+                results.append(row)
+                print(f"{n_shards:>7}{workers:>9}{qps:>10.0f}{qps / base_qps:>9.2f}{p50:>10.2f}{match:>8.3f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"n": len(vectors), "dim": int(vectors.shape[1]), "k": args.k,
+                       "batch": args.batch, "cpus": os.cpu_count(), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,328 @@
+import argparse
+import ast
+import glob
+import json
+import os
+import pickle
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from index_backends import INDEX_TYPES, make_index
+from ingredient_search import build_ingredient_index
+from lexical_index import build_lexical_index
+from recipe_cards import build_recipe_cards
+from recipe_store import RecipeStore, RecipeStoreWriter, recipe_text
+from sharded_index import write_shards
+
+DEFAULT_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+LIST_COLUMNS = ["ingredients", "directions"]
+
+
+# --------------------
+# Cleaning (same rules as rag_recipes.ipynb)
+# --------------------
+def safe_parse(x, sep=" "):
+    if isinstance(x, str):
+        try:
+            return sep.join(ast.literal_eval(x))
+        except Exception:
+            return x
+    return ""
+
+
+def clean_chunk(chunk):
+    chunk = chunk.drop(
+        columns=[c for c in chunk.columns if c.startswith("Unnamed") or c == "source"]
+    )
+    for col in LIST_COLUMNS:
+        if col in chunk.columns:
+            chunk[col] = chunk[col].apply(safe_parse)
+    if "NER" in chunk.columns:
+        # Unlike the notebook, keep item boundaries for ingredient_search.py.
+        chunk["NER"] = chunk["NER"].apply(safe_parse, sep=", ")
+    chunk["text"] = (
+        chunk["title"]
+        + ". Ingredients: "
+        + chunk["ingredients"]
+        + ". Directions: "
+        + chunk["directions"]
+    )
+    chunk = chunk[chunk["text"].notnull() & (chunk["text"].str.strip() != "")]
+    return chunk.reset_index(drop=True)
+
+
+# --------------------
+# Build state (resume support)
+# --------------------
+def write_json_atomic(path, data):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def load_state(work_dir, args):
+    state_path = os.path.join(work_dir, "build_state.json")
+    if args.fresh or not os.path.exists(state_path):
+        return {
+            "source": os.path.abspath(args.source),
+            "model": args.model,
+            "chunksize": args.chunksize,
+            "chunks_done": 0,
+            "rows_read": 0,
+            "records": 0,
+            "dim": None,
+            "embedded": False,
+        }
+    with open(state_path) as f:
+        state = json.load(f)
+    for key, value in [
+        ("source", os.path.abspath(args.source)),
+        ("model", args.model),
+        ("chunksize", args.chunksize),
+    ]:
+        if state[key] != value:
+            raise SystemExit(
+                f"Cannot resume: {key} changed ({state[key]!r} -> {value!r}). "
+                "Use --fresh to start over."
+            )
+    return state
+
+
+def check_not_ingested(args, state):
+    # ingest.py appends to the store and writes versioned indexes that the
+    # saved embeddings know nothing about; rebuilding from them would pair
+    # the old vectors with the changed store.
+    if os.path.exists(os.path.join(args.out, "manifest.json")):
+        raise SystemExit(
+            f"{args.out} has been changed by ingest.py (manifest.json). "
+            "Use --fresh to rebuild everything from the CSV."
+        )
+    store_path = os.path.join(args.out, "recipe_store")
+    if state["embedded"] and os.path.isdir(store_path) and len(RecipeStore(store_path)) != state["records"]:
+        raise SystemExit(
+            f"recipe_store no longer matches build_state.json ({state['records']} recipes). "
+            "Use --fresh to rebuild everything from the CSV."
+        )
+
+
+def remove_versions(out):
+    # A fresh build supersedes every version written by ingest.py.
+    manifest_path = os.path.join(out, "manifest.json")
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)
+    for path in glob.glob(os.path.join(out, "*.v*")):
+        if os.path.basename(path).split(".v")[-1].split(".")[0].isdigit():
+            if os.path.isdir(path):
+                remove_stale(path)
+            else:
+                os.remove(path)
+
+
+def truncate_embeddings(work_dir, state):
+    # Drop anything written after the last completed checkpoint.
+    emb_path = os.path.join(work_dir, "embeddings.f32")
+    if os.path.exists(emb_path) and state["dim"]:
+        with open(emb_path, "r+b") as f:
+            f.truncate(state["records"] * state["dim"] * 4)
+    elif state["records"] == 0 and os.path.exists(emb_path):
+        os.remove(emb_path)
+
+
+# --------------------
+# Stage 1: stream CSV -> clean -> embed -> append
+# --------------------
+def embed_source(args, work_dir, state, model=None):
+    if model is None:
+        from sentence_transformers import SentenceTransformer
+
+        model = SentenceTransformer(args.model)
+    state_path = os.path.join(work_dir, "build_state.json")
+    emb_path = os.path.join(work_dir, "embeddings.f32")
+    # The store is truncated back to the last checkpoint on resume.
+    store = RecipeStoreWriter(
+        os.path.join(args.out, "recipe_store"), records=state["records"]
+    )
+
+    reader = pd.read_csv(args.source, chunksize=args.chunksize, dtype=str)
+    for chunk_no, chunk in enumerate(reader):
+        if chunk_no < state["chunks_done"]:
+            continue
+        if args.limit and state["rows_read"] >= args.limit:
+            break
+        if args.limit:
+            chunk = chunk.iloc[: args.limit - state["rows_read"]]
+        rows_read = len(chunk)
+        chunk = clean_chunk(chunk)
+
+        if len(chunk):
+            embeddings = model.encode(
+                chunk["text"].tolist(),
+                batch_size=args.batch_size,
+                convert_to_numpy=True,
+            ).astype("float32", copy=False)
+            state["dim"] = int(embeddings.shape[1])
+            with open(emb_path, "ab") as f:
+                f.write(embeddings.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            store.append(chunk.to_dict("records"))
+            store.flush()
+
+        state["chunks_done"] = chunk_no + 1
+        state["rows_read"] += rows_read
+        state["records"] += len(chunk)
+        write_json_atomic(state_path, state)
+        print(
+            f"chunk {chunk_no}: {rows_read} rows read, "
+            f"{state['records']} recipes embedded"
+        )
+
+    store.close()
+    state["embedded"] = True
+    write_json_atomic(state_path, state)
+
+
+# --------------------
+# Stage 2: embeddings file -> FAISS index
+# --------------------
+def build_faiss_index(args, work_dir, state):
+    import faiss
+
+    emb_path = os.path.join(work_dir, "embeddings.f32")
+    embeddings = np.memmap(
+        emb_path, dtype="float32", mode="r", shape=(state["records"], state["dim"])
+    )
+    index = make_index(
+        args.index_type,
+        state["dim"],
+        nlist=args.nlist,
+        pq_m=args.pq_m,
+        hnsw_m=args.hnsw_m,
+    )
+    if not index.is_trained:
+        if state["records"] < args.nlist:
+            raise SystemExit(
+                f"{args.index_type} needs at least nlist={args.nlist} recipes to train, "
+                f"got {state['records']}."
+            )
+        rng = np.random.default_rng(args.seed)
+        n_train = min(args.train_size, state["records"])
+        sample = np.sort(rng.choice(state["records"], n_train, replace=False))
+        print(f"training {args.index_type} on {n_train} vectors")
+        index.train(np.ascontiguousarray(embeddings[sample]))
+    for start in range(0, state["records"], args.add_batch):
+        index.add(np.ascontiguousarray(embeddings[start : start + args.add_batch]))
+    index_path = os.path.join(args.out, "recipe_faiss.index")
+    faiss.write_index(index, index_path + ".tmp")
+    os.replace(index_path + ".tmp", index_path)
+    print(f"wrote {index_path} ({index.ntotal} vectors)")
+
+    shards_path = os.path.join(args.out, "recipe_shards")
+    if args.shards:
+        if args.index_type != "flat":
+            raise SystemExit("--shards needs --index-type flat")
+        ids = np.arange(state["records"], dtype="int64")
+        write_shards(embeddings, ids, shards_path, args.shards)
+        print(f"wrote {shards_path} ({args.shards} shards)")
+    else:
+        remove_stale(shards_path)
+
+
+def remove_stale(path):
+    # An artifact from an earlier build is keyed by the old recipe ids.
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+        print(f"removed stale {path}")
+
+
+def export_pickles(args):
+    # Legacy artifacts for older app.py deployments; holds the whole corpus in RAM.
+    store = RecipeStore(os.path.join(args.out, "recipe_store"))
+    df = pd.DataFrame([dict(recipe) for recipe in store])
+    df["text"] = [recipe_text(recipe) for recipe in store]
+    df.to_pickle(os.path.join(args.out, "cleaned_recipes.pkl"))
+    with open(os.path.join(args.out, "recipe_texts.pkl"), "wb") as f:
+        pickle.dump(df["text"].tolist(), f)
+    print(f"wrote cleaned_recipes.pkl and recipe_texts.pkl ({len(df)} recipes)")
+
+
+def main(argv=None, model=None):
+    parser = argparse.ArgumentParser(
+        description="Stream a RecipeNLG CSV into a FAISS index in bounded memory."
+    )
+    parser.add_argument("source", help="path to the RecipeNLG / Recipes1M CSV")
+    parser.add_argument("--out", default=".", help="directory for the artifacts")
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--chunksize", type=int, default=10000)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--add-batch", type=int, default=100000)
+    parser.add_argument("--limit", type=int, default=0, help="stop after N rows")
+    parser.add_argument("--index-type", choices=INDEX_TYPES, default="flat")
+    parser.add_argument("--nlist", type=int, default=1024, help="IVF lists")
+    parser.add_argument("--pq-m", type=int, default=16, help="PQ sub-quantizers")
+    parser.add_argument("--hnsw-m", type=int, default=32, help="HNSW neighbours")
+    parser.add_argument("--train-size", type=int, default=200000)
+    parser.add_argument(
+        "--shards", type=int, default=0, help="also split a flat index into N shards"
+    )
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--fresh", action="store_true", help="ignore saved progress")
+    parser.add_argument(
+        "--no-lexical", action="store_true", help="skip the BM25 title/NER index"
+    )
+    parser.add_argument(
+        "--no-ingredients", action="store_true", help="skip the what-can-I-cook index"
+    )
+    parser.add_argument(
+        "--no-cards", action="store_true", help="skip the pre-rendered recipe cards"
+    )
+    parser.add_argument(
+        "--export-pickles",
+        action="store_true",
+        help="also write the legacy cleaned_recipes.pkl / recipe_texts.pkl",
+    )
+    args = parser.parse_args(argv)
+
+    work_dir = os.path.join(args.out, "build")
+    os.makedirs(work_dir, exist_ok=True)
+    state = load_state(work_dir, args)
+    if args.fresh:
+        remove_versions(args.out)
+    else:
+        check_not_ingested(args, state)
+    truncate_embeddings(work_dir, state)
+
+    if not state["embedded"]:
+        embed_source(args, work_dir, state, model)
+    if not state["records"]:
+        raise SystemExit("No recipes found in source.")
+    build_faiss_index(args, work_dir, state)
+    if args.no_lexical:
+        remove_stale(os.path.join(args.out, "lexical_index"))
+    else:
+        store = RecipeStore(os.path.join(args.out, "recipe_store"))
+        lexical = build_lexical_index(store, os.path.join(args.out, "lexical_index"))
+        print(f"wrote lexical_index ({len(lexical.vocab)} terms)")
+    if args.no_ingredients:
+        remove_stale(os.path.join(args.out, "ingredient_index"))
+    else:
+        store = RecipeStore(os.path.join(args.out, "recipe_store"))
+        ingredients = build_ingredient_index(store, os.path.join(args.out, "ingredient_index"))
+        print(f"wrote ingredient_index ({len(ingredients.items)} ingredients)")
+    if args.no_cards:
+        remove_stale(os.path.join(args.out, "recipe_cards"))
+    else:
+        store = RecipeStore(os.path.join(args.out, "recipe_store"))
+        cards = build_recipe_cards(store, os.path.join(args.out, "recipe_cards"))
+        print(f"wrote recipe_cards ({len(cards)} recipes)")
+    if args.export_pickles:
+        export_pickles(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""Conversation state machine behind the Streamlit chat.
+
+app.py only draws widgets; every reply is decided here by Chat, which works
+on any session-state object with attribute access (st.session_state in the
+app, types.SimpleNamespace in tests) and on either RecipeEngine or
+RemoteEngine:
+
+    chat = Chat(engine, st.session_state)
+    chat.handle_message("give me pizza ingredients")
+"""
+from intent_router import route
+from metrics import span
+from recipe_cards import how_to_make
+
+WELCOME = (
+    "Hello! 👋 What would you like to do today? "
+    "You can choose an option below or type your question directly."
+)
+ASK_NAME = "Sure! What is the name of the recipe you want to check?"
+ANOTHER = "Do you want to see another recipe? (yes/no)"
+# mode -> (user message shown for the button, bot prompt)
+BUTTONS = {
+    "waiting_ingredient": ("Check Ingredients", ASK_NAME),
+    "waiting_direction": ("Check Cooking Steps", ASK_NAME),
+    "waiting_fridge": ("What Can I Cook?", "Tell me what you have in your fridge, e.g. chicken, rice, carrots."),
+}
+# intent -> (mode_type, mode that waits for a recipe name, reply when nothing matches)
+RECIPE_INTENTS = {
+    "ingredients": ("ingredient", "waiting_ingredient", "Sorry, I couldn’t find the ingredients for that recipe. 😔"),
+    "steps": ("step", "waiting_direction", "Sorry, I couldn’t find the cooking steps for that recipe. 😔"),
+    "how_to": ("how_to", "waiting_direction", "Sorry, I couldn’t find that recipe. 😔"),
+}
+SMALL_TALK = {
+    "greeting": "Hi there! 😊 How can I help you with your cooking today?",
+    "thanks": "You're welcome! Let me know if you need anything else. 🍀",
+    "help": "I can help you with ingredients or cooking steps. Just mention the recipe name. 🍳",
+}
+
+
+def init_state(state):
+    if not hasattr(state, "messages"):
+        state.messages = [{"role": "assistant", "content": WELCOME}]
+    if not hasattr(state, "mode"):
+        state.mode = "menu"
+
+
+class Chat:
+    def __init__(self, engine, state):
+        self.engine = engine
+        self.state = state
+        init_state(state)
+
+    def say(self, content):
+        self.state.messages.append({"role": "assistant", "content": content})
+
+    def press(self, mode):
+        # One of the three buttons under the chat.
+        label, prompt = BUTTONS[mode]
+        self.state.messages.append({"role": "user", "content": label})
+        self.say(prompt)
+        self.state.mode = mode
+
+    def handle_message(self, prompt):
+        self.state.messages.append({"role": "user", "content": prompt})
+        with span("route"):
+            intent, query = route(prompt, self.state.mode)
+        if intent == "fridge":
+            self.reply_with_fridge(query)
+        elif intent in RECIPE_INTENTS:
+            self.reply_with_recipe(intent, query)
+        elif intent == "yes":
+            self.reply_with_next()
+        elif intent == "no":
+            self.say("Okay! You can type another recipe name anytime. 🍳")
+            self.state.mode = "menu"
+        else:
+            self.say(SMALL_TALK[intent])
+
+    def search(self, query, top_k=3):
+        with span("search"):
+            return self.engine.search(query, top_k)
+
+    def recipe_reply(self, recipe, kind):
+        engine = self.engine
+        if kind == "ingredient":
+            return f"Here are the ingredients for **{recipe['title']}**:\n\n{engine.ingredients_card(recipe)}"
+        if kind == "step":
+            return f"Here are the cooking steps for **{recipe['title']}**:\n\n{engine.steps_card(recipe)}"
+        return how_to_make(recipe["title"], engine.ingredients_card(recipe), engine.steps_card(recipe))
+
+    def reply_with_recipe(self, intent, query):
+        kind, waiting_mode, not_found = RECIPE_INTENTS[intent]
+        if not query:
+            self.say(ASK_NAME)
+            self.state.mode = waiting_mode
+            return
+        results = self.search(query, top_k=5)
+        if not results:
+            if self.state.mode == waiting_mode:
+                not_found = "Sorry, I couldn’t find that recipe. 😔 Please try another name."
+            self.say(not_found)
+            self.state.mode = waiting_mode
+            return
+        self.state.last_results = results
+        self.state.last_index = 0
+        self.state.mode_type = kind
+        self.say(self.recipe_reply(results[0], kind))
+        self.say(ANOTHER)
+        self.state.mode = "ask_another"
+
+    def reply_with_fridge(self, prompt):
+        engine = self.engine
+        if not engine.can_cook():
+            self.say("Sorry, ingredient search is not available right now. 😔")
+            self.state.mode = "menu"
+            return
+        with span("search"):
+            found, ranked = engine.cook(prompt, top_k=5)
+        if not ranked:
+            self.say("Sorry, I couldn’t find a recipe with those ingredients. 😔 Try listing a few more.")
+            self.state.mode = "waiting_fridge"
+            return
+        first_recipe, have, total, missing = ranked[0]
+        self.state.last_results = [recipe for recipe, _, _, _ in ranked]
+        self.state.last_index = 0
+        self.state.mode_type = "ingredient"
+        bot_reply = f"You can make **{first_recipe['title']}** (you have {have} of {total} ingredients)"
+        if missing:
+            bot_reply += f", you only need: {', '.join(missing)}"
+        bot_reply += f".\n\n{engine.ingredients_card(first_recipe)}"
+        self.say(bot_reply)
+        self.say(ANOTHER)
+        self.state.mode = "ask_another"
+
+    def reply_with_next(self):
+        state = self.state
+        state.last_index += 1
+        if state.last_index < len(state.last_results):
+            self.say(self.recipe_reply(state.last_results[state.last_index], state.mode_type))
+            self.say(ANOTHER)
+        else:
+            self.say("No more similar recipes found. 😔")
+            state.mode = "menu"
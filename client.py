@@ -0,0 +1,45 @@
+"""HTTP client for service.py with the same interface as engine.RecipeEngine."""
+import json
+import urllib.parse
+import urllib.request
+
+from metrics import span
+from recipe_cards import format_list, format_steps
+
+
+class RemoteEngine:
+    def __init__(self, base_url, timeout=10):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def _get(self, path, **params):
+        url = f"{self.base_url}{path}?{urllib.parse.urlencode(params)}"
+        with urllib.request.urlopen(url, timeout=self.timeout) as response:
+            return json.load(response)
+
+    def search(self, query, top_k=3):
+        if not query.strip():
+            return []
+        return self._get("/search", q=query, top_k=top_k)["results"]
+
+    def cook(self, text, top_k=5):
+        data = self._get("/cook", q=text, top_k=top_k)
+        return data["ingredients"], [
+            (r, r["have"], r["total"], r["missing"]) for r in data["results"]
+        ]
+
+    def can_cook(self):
+        return self._get("/health")["ingredient_search"]
+
+    def ingredients_card(self, recipe):
+        # /search and /cook send the rendered cards; older services do not.
+        if recipe.get("ingredients_card") is not None:
+            return recipe["ingredients_card"]
+        with span("format"):
+            return format_list(recipe["ingredients"])
+
+    def steps_card(self, recipe):
+        if recipe.get("steps_card") is not None:
+            return recipe["steps_card"]
+        with span("format"):
+            return format_steps(recipe["directions"])
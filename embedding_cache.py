@@ -0,0 +1,121 @@
+import os
+import pickle
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_query(query):
+    # all-MiniLM-L6-v2 is uncased, so lowercasing does not change the embedding.
+    return _SPACES.sub(" ", query.lower()).strip(" .,!?")
+
+
+class EmbeddingCache:
+    def __init__(self, model, max_size=10000, ttl=None, path=None, save_every=100, signature=None):
+        self.model = model
+        # Identifies the encoder (e.g. model, backend, dimension); a saved
+        # cache written by a different one is discarded on load.
+        self.signature = signature
+        self.max_size = max_size
+        self.ttl = ttl
+        self.path = path
+        self.save_every = save_every
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._unsaved = 0
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            self.load(path)
+
+    def _get(self, key, now):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        vector, created = entry
+        if self.ttl is not None and now - created > self.ttl:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return vector
+
+    def _put(self, key, vector, now):
+        self._entries[key] = (vector, now)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        self._unsaved += 1
+
+    def encode(self, query):
+        return self.encode_many([query])
+
+    def encode_many(self, queries):
+        keys = [normalize_query(q) for q in queries]
+        now = time.time()
+        found = {}
+        missing = []
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                vector = self._get(key, now)
+                if vector is None:
+                    missing.append(key)
+                else:
+                    found[key] = vector
+            self.misses += len(missing)
+            self.hits += len(keys) - len(missing)
+
+        if missing:
+            vectors = np.asarray(self.model.encode(missing), dtype="float32")
+            with self._lock:
+                for key, vector in zip(missing, vectors):
+                    found[key] = vector
+                    self._put(key, vector, now)
+                should_save = self.path and self._unsaved >= self.save_every
+            if should_save:
+                self.save()
+        return np.stack([found[k] for k in keys])
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._entries),
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def save(self, path=None):
+        path = path or self.path
+        with self._lock:
+            entries = list(self._entries.items())
+            self._unsaved = 0
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump({"signature": self.signature, "entries": entries}, f)
+        os.replace(tmp_path, path)
+
+    def load(self, path):
+        with open(path, "rb") as f:
+            saved = pickle.load(f)
+        # Files from before signatures were saved are a bare list of entries.
+        if not isinstance(saved, dict) or saved.get("signature") != self.signature:
+            print(f"ignoring {path}: written by a different encoder")
+            return
+        entries = saved["entries"]
+        now = time.time()
+        with self._lock:
+            for key, (vector, created) in entries:
+                if self.ttl is None or now - created <= self.ttl:
+                    self._entries[key] = (vector, created)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
@@ -0,0 +1,52 @@
+"""Pluggable CPU backends for the MiniLM query encoder.
+
+    torch       fp32 PyTorch weights (default)
+    torch-int8  PyTorch with dynamically quantized int8 Linear layers
+    onnx        ONNX Runtime export
+    onnx-int8   ONNX Runtime, dynamically quantized int8 export
+
+All of them return the same SentenceTransformer interface. Check a backend
+against the fp32 index before switching with quantize_encoder.py.
+"""
+ENCODER_BACKENDS = ["torch", "torch-int8", "onnx", "onnx-int8"]
+DEFAULT_INT8_ONNX_FILE = "onnx/model_qint8_avx512.onnx"
+
+
+def quantize_torch(model):
+    import torch
+    from torch.ao.quantization import quantize_dynamic
+
+    transformer = model[0]
+    transformer.auto_model = quantize_dynamic(
+        transformer.auto_model, {torch.nn.Linear}, dtype=torch.qint8
+    )
+    return model
+
+
+def load_encoder(model_name, backend=None, file_name=None):
+    from sentence_transformers import SentenceTransformer
+
+    backend = backend or "torch"
+    if backend not in ENCODER_BACKENDS:
+        raise ValueError(f"Unknown encoder backend {backend!r}, expected one of {ENCODER_BACKENDS}")
+
+    if backend.startswith("onnx"):
+        if backend == "onnx-int8":
+            file_name = file_name or DEFAULT_INT8_ONNX_FILE
+        model_kwargs = {"file_name": file_name} if file_name else None
+        return SentenceTransformer(model_name, backend="onnx", model_kwargs=model_kwargs)
+
+    model = SentenceTransformer(model_name, device="cpu" if backend == "torch-int8" else None)
+    if backend == "torch-int8":
+        quantize_torch(model)
+    return model
+
+
+def export_onnx_int8(model_name, output_dir, quantization_config="avx512"):
+    # Writes output_dir/onnx/model_qint8_<config>.onnx next to a plain ONNX export.
+    from sentence_transformers import SentenceTransformer, export_dynamic_quantized_onnx_model
+
+    model = SentenceTransformer(model_name, backend="onnx")
+    model.save(output_dir)
+    export_dynamic_quantized_onnx_model(model, quantization_config, output_dir)
+    return f"onnx/model_qint8_{quantization_config}.onnx"
@@ -0,0 +1,114 @@
+"""Dynamic micro-batching in front of the SentenceTransformer query encoder.
+
+Concurrent callers (Streamlit sessions, service workers) each submit a few
+queries; a background thread collects everything that arrives within
+max_wait seconds, up to max_batch queries, and encodes it in one forward pass.
+"""
+import queue
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Future
+
+import numpy as np
+
+_STOP = object()
+
+
+def _summary_ms(values):
+    if not values:
+        return {"p50": 0.0, "p95": 0.0, "max": 0.0}
+    values = np.asarray(values) * 1000
+    return {
+        "p50": float(np.percentile(values, 50)),
+        "p95": float(np.percentile(values, 95)),
+        "max": float(values.max()),
+    }
+
+
+class BatchingEncoder:
+    def __init__(self, model, max_batch=32, max_wait=0.002, history=1000):
+        self.model = model
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self.batch_sizes = Counter()
+        self.queue_delays = deque(maxlen=history)
+        self.encode_times = deque(maxlen=history)
+        self._thread = threading.Thread(target=self._run, name="batching-encoder", daemon=True)
+        self._thread.start()
+
+    def encode(self, sentences, **kwargs):
+        # Same call shape as SentenceTransformer.encode for a str or list of str.
+        single = isinstance(sentences, str)
+        futures = []
+        for sentence in [sentences] if single else sentences:
+            future = Future()
+            self._queue.put((sentence, future, time.monotonic()))
+            futures.append(future)
+        if not futures:
+            return np.empty((0, self.get_sentence_embedding_dimension()), dtype="float32")
+        vectors = np.stack([f.result() for f in futures])
+        return vectors[0] if single else vectors
+
+    def get_sentence_embedding_dimension(self):
+        return self.model.get_sentence_embedding_dimension()
+
+    def _collect(self):
+        first = self._queue.get()
+        if first is _STOP:
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            timeout = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                self._queue.put(_STOP)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            started = time.monotonic()
+            try:
+                vectors = self.model.encode([s for s, _, _ in batch], convert_to_numpy=True)
+            except Exception as exc:
+                for _, future, _ in batch:
+                    future.set_exception(exc)
+                continue
+            finished = time.monotonic()
+            for (_, future, _), vector in zip(batch, np.asarray(vectors, dtype="float32")):
+                future.set_result(vector)
+            with self._lock:
+                self.batch_sizes[len(batch)] += 1
+                self.queue_delays.extend(started - enqueued for _, _, enqueued in batch)
+                self.encode_times.append(finished - started)
+
+    def metrics(self):
+        with self._lock:
+            sizes = dict(sorted(self.batch_sizes.items()))
+            delays = list(self.queue_delays)
+            encode_times = list(self.encode_times)
+        batches = sum(sizes.values())
+        requests = sum(size * n for size, n in sizes.items())
+        return {
+            "batches": batches,
+            "requests": requests,
+            "mean_batch_size": requests / batches if batches else 0.0,
+            "batch_size_histogram": sizes,
+            "queue_delay_ms": _summary_ms(delays),
+            "encode_ms": _summary_ms(encode_times),
+        }
+
+    def close(self):
+        self._queue.put(_STOP)
+        self._thread.join()
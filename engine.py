@@ -0,0 +1,355 @@
+"""Recipe retrieval engine shared by the Streamlit app and the HTTP service.
+
+faiss, pandas and sentence-transformers/torch are imported lazily inside the
+loaders below, and RecipeEngine runs those loaders concurrently, so a cold
+start costs roughly the slowest artifact rather than the sum of all of them.
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from answer_cache import AnswerCache
+from embedding_cache import EmbeddingCache
+from encoder_batching import BatchingEncoder
+from ingest import MANIFEST, artifact_path, read_manifest
+from ingredient_search import IngredientIndex, what_can_i_cook
+from lexical_index import LexicalIndex
+from metrics import METRICS, span
+from recipe_cards import RecipeCards, format_list, format_steps
+from recipe_store import DataFrameStore, RecipeStore
+from retrieval import MAX_DISTANCE, hybrid_search, search_vectors
+
+DEFAULT_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+RECIPE_FIELDS = ["title", "ingredients", "directions", "NER", "link"]
+
+
+def recipe_to_dict(recipe, recipe_id=None):
+    data = {"id": recipe_id} if recipe_id is not None else {}
+    for field in RECIPE_FIELDS:
+        if field in recipe:
+            value = recipe[field]
+            data[field] = value if isinstance(value, str) else ""
+    return data
+
+
+def load_store(artifacts_dir):
+    # The mmap store is shared through the page cache by every worker process;
+    # the pickled DataFrame is only a fallback for older artifacts.
+    store_path = os.path.join(artifacts_dir, "recipe_store")
+    if os.path.isdir(store_path):
+        return RecipeStore(store_path)
+    import pandas as pd
+
+    return DataFrameStore(pd.read_pickle(os.path.join(artifacts_dir, "cleaned_recipes.pkl")))
+
+
+def load_index(artifacts_dir, manifest=None):
+    import faiss
+
+    from index_backends import set_search_params
+
+    shards_path = artifact_path(artifacts_dir, "recipe_shards", manifest)
+    if os.path.isdir(shards_path):
+        from sharded_index import ShardedIndex
+
+        workers = os.environ.get("RECIPE_SHARD_WORKERS")
+        return ShardedIndex(shards_path, None if workers is None else int(workers))
+
+    index = faiss.read_index(artifact_path(artifacts_dir, "recipe_faiss.index", manifest))
+    # Only used by IVF / HNSW indexes built with build_index.py --index-type
+    set_search_params(
+        index,
+        nprobe=os.environ.get("RECIPE_NPROBE", 16),
+        ef_search=os.environ.get("RECIPE_EF_SEARCH", 64),
+    )
+    return index
+
+
+def load_model(model_name, backend=None, file_name=None):
+    from encoder_backends import load_encoder
+
+    model = load_encoder(model_name, backend, file_name)
+    # Pay for lazy kernel initialisation here rather than on the first question.
+    model.encode(["warm up"])
+    return model
+
+
+def load_optional(cls, artifacts_dir, name, manifest=None):
+    path = artifact_path(artifacts_dir, name, manifest)
+    return cls(path) if os.path.isdir(path) else None
+
+
+class Artifacts:
+    # One consistent version of everything ingest.py can swap underneath us.
+    def __init__(self, version, store, index, lexical, ingredient_index, cards):
+        self.version = version
+        self.store = store
+        self.index = index
+        self.lexical = lexical
+        self.ingredient_index = ingredient_index
+        self.cards = cards
+
+
+class RecipeEngine:
+    def __init__(self, artifacts_dir=".", model_name=None, backend=None, model_file=None, model=None):
+        self._started = time.perf_counter()
+        self.startup_timings = {}
+        # See encoder_backends.py; validate a backend with quantize_encoder.py first.
+        model_name = model_name or os.environ.get("RECIPE_ENCODER_MODEL", DEFAULT_MODEL)
+        backend = backend or os.environ.get("RECIPE_ENCODER_BACKEND")
+        model_file = model_file or os.environ.get("RECIPE_ENCODER_FILE")
+
+        self.artifacts_dir = artifacts_dir
+        self.max_distance = float(os.environ.get("RECIPE_MAX_DISTANCE", MAX_DISTANCE))
+        self.reload_interval = float(os.environ.get("RECIPE_RELOAD_INTERVAL", 2))
+        self._reload_lock = threading.Lock()
+        self._last_check = time.monotonic()
+        # Every loader gets the same manifest, so one snapshot is one version.
+        self._manifest_mtime = self._read_manifest_mtime()
+        manifest = read_manifest(artifacts_dir)
+        version = manifest["version"]
+
+        with ThreadPoolExecutor(max_workers=6) as pool:
+            phases = {
+                "index": pool.submit(self._timed, "index", load_index, artifacts_dir, manifest),
+                "store": pool.submit(self._timed, "store", load_store, artifacts_dir),
+                "lexical": pool.submit(
+                    self._timed, "lexical", load_optional,
+                    LexicalIndex, artifacts_dir, "lexical_index", manifest,
+                ),
+                "ingredients": pool.submit(
+                    self._timed, "ingredients", load_optional,
+                    IngredientIndex, artifacts_dir, "ingredient_index", manifest,
+                ),
+                "cards": pool.submit(
+                    self._timed, "cards", load_optional,
+                    RecipeCards, artifacts_dir, "recipe_cards", manifest,
+                ),
+            }
+            if model is None:
+                phases["model"] = pool.submit(
+                    self._timed, "model", load_model, model_name, backend, model_file
+                )
+            self.model = model if model is not None else phases["model"].result()
+            self.artifacts = Artifacts(
+                version,
+                phases["store"].result(),
+                phases["index"].result(),
+                phases["lexical"].result(),
+                phases["ingredients"].result(),
+                phases["cards"].result(),
+            )
+
+        # Concurrent sessions share forward passes instead of encoding one query each.
+        self.encoder = BatchingEncoder(
+            self.model,
+            max_batch=int(os.environ.get("RECIPE_MAX_BATCH", 32)),
+            max_wait=float(os.environ.get("RECIPE_MAX_WAIT_MS", 2)) / 1000,
+        )
+        self.query_cache = EmbeddingCache(
+            self.encoder,
+            max_size=int(os.environ.get("RECIPE_QUERY_CACHE_SIZE", 10000)),
+            path=os.environ.get("RECIPE_QUERY_CACHE_PATH") or None,
+            signature=[
+                model_name, backend or "torch", model_file, self.encoder.get_sentence_embedding_dimension()
+            ],
+        )
+        # Second level: result ids of recent queries, keyed by their embedding.
+        answer_cache_size = int(os.environ.get("RECIPE_ANSWER_CACHE_SIZE", 1000))
+        self.answer_cache = None
+        if answer_cache_size:
+            self.answer_cache = AnswerCache(
+                self.encoder.get_sentence_embedding_dimension(),
+                max_size=answer_cache_size,
+                max_distance=float(os.environ.get("RECIPE_ANSWER_CACHE_DISTANCE", 0.1)),
+            )
+            self.answer_cache.clear(version)
+            METRICS.gauge(
+                "answer_cache_hit_rate", lambda: self.answer_cache.stats()["hit_rate"],
+                "Share of searches answered from a nearby cached query.",
+            )
+        self.startup_timings["total"] = time.perf_counter() - self._started
+        METRICS.gauge(
+            "query_cache_hit_rate", lambda: self.query_cache.stats()["hit_rate"],
+            "Share of query embeddings served from the cache.",
+        )
+        METRICS.gauge("query_cache_entries", lambda: self.query_cache.stats()["size"])
+        METRICS.gauge(
+            "encoder_mean_batch_size", lambda: self.encoder.metrics()["mean_batch_size"],
+            "Queries per forward pass of the micro-batching encoder.",
+        )
+
+    @property
+    def store(self):
+        return self.artifacts.store
+
+    @property
+    def index(self):
+        return self.artifacts.index
+
+    @property
+    def lexical(self):
+        return self.artifacts.lexical
+
+    @property
+    def ingredient_index(self):
+        return self.artifacts.ingredient_index
+
+    def _read_manifest_mtime(self):
+        try:
+            return os.stat(os.path.join(self.artifacts_dir, MANIFEST)).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def maybe_reload(self):
+        # Picks up a version committed by ingest.py; checked at most every
+        # reload_interval seconds, so the hot path is a clock read. The new
+        # version loads in a background thread while queries keep using the
+        # current snapshot. Returns True if a reload was started.
+        now = time.monotonic()
+        if now - self._last_check < self.reload_interval:
+            return False
+        self._last_check = now
+        mtime = self._read_manifest_mtime()
+        if mtime == self._manifest_mtime or not self._reload_lock.acquire(blocking=False):
+            return False
+        threading.Thread(target=self._reload, args=(mtime,), daemon=True).start()
+        return True
+
+    def _reload(self, mtime):
+        try:
+            manifest = read_manifest(self.artifacts_dir)
+            version = manifest["version"]
+            if version != self.artifacts.version:
+                self.artifacts = Artifacts(
+                    version,
+                    load_store(self.artifacts_dir),
+                    load_index(self.artifacts_dir, manifest),
+                    load_optional(LexicalIndex, self.artifacts_dir, "lexical_index", manifest),
+                    load_optional(IngredientIndex, self.artifacts_dir, "ingredient_index", manifest),
+                    load_optional(RecipeCards, self.artifacts_dir, "recipe_cards", manifest),
+                )
+                if self.answer_cache is not None:
+                    self.answer_cache.clear(version)
+            # On failure the mtime stays stale, so the next check retries.
+            self._manifest_mtime = mtime
+        finally:
+            self._reload_lock.release()
+
+    def _timed(self, phase, fn, *args):
+        start = time.perf_counter()
+        result = fn(*args)
+        self.startup_timings[phase] = time.perf_counter() - start
+        return result
+
+    def startup_report(self):
+        parts = ", ".join(
+            f"{phase} {seconds:.2f}s"
+            for phase, seconds in self.startup_timings.items()
+            if phase != "total"
+        )
+        return f"engine ready in {self.startup_timings['total']:.2f}s ({parts})"
+
+    def search_ids(self, query, top_k=3, encode=None):
+        self.maybe_reload()
+        artifacts = self.artifacts
+        encode = encode or self.query_cache.encode
+
+        def timed_encode(text):
+            # Includes the query cache lookup; hits show up as sub-ms encodes.
+            with span("encode"):
+                return encode(text)
+
+        # Exact title matches are already answered without the encoder, so
+        # only the other queries go through the semantic answer cache.
+        vector = None
+        if self.answer_cache is not None and (
+            artifacts.lexical is None or not len(artifacts.lexical.exact_title(query))
+        ):
+            vector = timed_encode(query)
+            ids = self.answer_cache.get(vector, top_k)
+            if ids is not None:
+                return ids
+
+        if artifacts.lexical is not None:
+            ids = hybrid_search(
+                query,
+                timed_encode if vector is None else lambda _: vector,
+                artifacts.index,
+                artifacts.lexical,
+                top_k,
+                self.max_distance,
+                is_deleted=artifacts.store.is_deleted,
+            )
+        else:
+            result = search_vectors(
+                artifacts.index,
+                timed_encode(query) if vector is None else vector,
+                top_k,
+                max_distance=self.max_distance,
+            )
+            ids = [int(i) for i in result.hit_ids(0)]
+        if "first_answer" not in self.startup_timings:
+            # Time-to-first-answer, measured from the start of loading.
+            self.startup_timings["first_answer"] = time.perf_counter() - self._started
+        ids = [i for i in ids if not artifacts.store.is_deleted(i)]
+        if vector is not None:
+            self.answer_cache.put(vector, top_k, ids, artifacts.version)
+        return ids
+
+    def search(self, query, top_k=3, encode=None):
+        # The store only grows, so ids from any version resolve in the latest one.
+        ids = self.search_ids(query, top_k, encode)
+        with span("fetch"):
+            return [self.store[i] for i in ids]
+
+    def _card(self, recipe):
+        artifacts = self.artifacts
+        cards = artifacts.cards
+        recipe_id = getattr(recipe, "id", None)
+        # Cards written for a different store would be indexed by other ids.
+        if cards is not None and recipe_id is not None and len(cards) == len(artifacts.store):
+            return cards, recipe_id
+        return None, None
+
+    def ingredients_card(self, recipe):
+        # Pre-rendered by build_index.py / recipe_cards.py when available.
+        with span("format"):
+            cards, recipe_id = self._card(recipe)
+            if cards is not None:
+                return cards.ingredients(recipe_id)
+            return format_list(recipe["ingredients"])
+
+    def steps_card(self, recipe):
+        with span("format"):
+            cards, recipe_id = self._card(recipe)
+            if cards is not None:
+                return cards.steps(recipe_id)
+            return format_steps(recipe["directions"])
+
+    def can_cook(self):
+        self.maybe_reload()
+        return self.artifacts.ingredient_index is not None
+
+    def cook(self, text, top_k=5, encode=None):
+        # Returns the ingredients understood from the text and
+        # [(recipe, have, total, missing), ...] ranked by coverage.
+        self.maybe_reload()
+        artifacts = self.artifacts
+        if artifacts.ingredient_index is None:
+            return [], []
+        encode = encode or self.query_cache.encode
+
+        def semantic(query, n):
+            result = search_vectors(artifacts.index, encode(query), n, max_distance=float("inf"))
+            # Recipes ingested since the ingredient index was built are not in it.
+            return [i for i in result.hit_ids(0) if i < len(artifacts.ingredient_index)]
+
+        with span("cook"):
+            found, ranked = what_can_i_cook(text, artifacts.ingredient_index, top_k, semantic)
+        return found, [
+            (artifacts.store[i], have, total, artifacts.ingredient_index.missing(i, found))
+            for i, have, total in ranked
+            if not artifacts.store.is_deleted(i)
+        ]
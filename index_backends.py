@@ -0,0 +1,46 @@
+import faiss
+
+INDEX_TYPES = ["flat", "ivf_flat", "ivf_pq", "hnsw"]
+
+
+def factory_string(index_type, nlist=1024, pq_m=16, pq_bits=8, hnsw_m=32):
+    if index_type == "flat":
+        return "Flat"
+    if index_type == "ivf_flat":
+        return f"IVF{nlist},Flat"
+    if index_type == "ivf_pq":
+        return f"IVF{nlist},PQ{pq_m}x{pq_bits}"
+    if index_type == "hnsw":
+        return f"HNSW{hnsw_m}"
+    raise ValueError(f"Unknown index type {index_type!r}, expected one of {INDEX_TYPES}")
+
+
+def make_index(index_type, dim, nlist=1024, pq_m=16, pq_bits=8, hnsw_m=32, ef_construction=200):
+    index = faiss.index_factory(
+        dim, factory_string(index_type, nlist, pq_m, pq_bits, hnsw_m), faiss.METRIC_L2
+    )
+    if index_type == "hnsw":
+        faiss.downcast_index(index).hnsw.efConstruction = ef_construction
+    return index
+
+
+def is_ivf(index):
+    return faiss.try_extract_index_ivf(index) is not None
+
+
+def is_hnsw(index):
+    return isinstance(faiss.downcast_index(index), faiss.IndexHNSW)
+
+
+def set_search_params(index, nprobe=None, ef_search=None):
+    # Query-time knobs; ignored for index types that do not have them.
+    params = faiss.ParameterSpace()
+    if nprobe is not None and is_ivf(index):
+        params.set_index_parameter(index, "nprobe", int(nprobe))
+    if ef_search is not None and is_hnsw(index):
+        params.set_index_parameter(index, "efSearch", int(ef_search))
+    return index
+
+
+def index_nbytes(index):
+    return int(faiss.serialize_index(index).nbytes)
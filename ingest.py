@@ -0,0 +1,274 @@
+"""Incremental recipe ingestion: add, update and delete without a full rebuild.
+
+    python ingest.py upsert new_recipes.csv      # RecipeNLG-format CSV
+    python ingest.py delete <link-or-title> ...
+
+Recipes are keyed on their link (title when there is no link). Only new or
+changed recipes are embedded; unchanged ones are skipped by content hash.
+The FAISS index is id-mapped so replaced and deleted recipes can be removed.
+Every commit that changes something writes a new index version and swaps
+manifest.json atomically; a running engine notices the new version and
+reloads it without a restart. The lexical and ingredient indexes are only
+rebuilt with --rebuild-aux.
+"""
+import argparse
+import glob
+import json
+import os
+import shutil
+from collections import Counter
+
+import numpy as np
+
+from recipe_store import RecipeStore, RecipeStoreWriter, _hash64, record_hashes, recipe_text
+
+DEFAULT_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+MANIFEST = "manifest.json"
+
+
+# --------------------
+# Manifest: which file holds the current version of each artifact
+# --------------------
+def read_manifest(artifacts_dir):
+    try:
+        with open(os.path.join(artifacts_dir, MANIFEST)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"version": 0}
+
+
+def artifact_path(artifacts_dir, name, manifest=None):
+    manifest = manifest if manifest is not None else read_manifest(artifacts_dir)
+    return os.path.join(artifacts_dir, manifest.get(name, name))
+
+
+def write_manifest(artifacts_dir, manifest):
+    path = os.path.join(artifacts_dir, MANIFEST)
+    with open(path + ".tmp", "w") as f:
+        json.dump(manifest, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(path + ".tmp", path)
+
+
+def load_id_mapped_index(path):
+    import faiss
+
+    from index_backends import is_hnsw, is_ivf
+
+    index = faiss.read_index(path)
+    if isinstance(index, (faiss.IndexIDMap, faiss.IndexIDMap2)) or is_ivf(index):
+        return index
+    if is_hnsw(index):
+        raise SystemExit(
+            "HNSW indexes cannot remove vectors; rebuild with "
+            "build_index.py --index-type flat, ivf_flat or ivf_pq."
+        )
+    # Plain flat index: ids are positions, which are also the store ids.
+    mapped = faiss.IndexIDMap2(faiss.IndexFlatL2(index.d))
+    if index.ntotal:
+        mapped.add_with_ids(index.reconstruct_n(0, index.ntotal), np.arange(index.ntotal, dtype="int64"))
+    return mapped
+
+
+class RecipeIngestor:
+    def __init__(self, artifacts_dir=".", model=None, model_name=DEFAULT_MODEL, batch_size=256):
+        self.artifacts_dir = artifacts_dir
+        self.manifest = read_manifest(artifacts_dir)
+        self.store_path = os.path.join(artifacts_dir, "recipe_store")
+        if not os.path.isdir(self.store_path):
+            raise SystemExit(
+                "No recipe_store found; create it with build_index.py or "
+                "python recipe_store.py cleaned_recipes.pkl recipe_store"
+            )
+        self.index = load_id_mapped_index(
+            artifact_path(artifacts_dir, "recipe_faiss.index", self.manifest)
+        )
+        if not self.manifest["version"] and "records" not in self.manifest:
+            self._pin_build()
+        # The store is flushed before the manifest is swapped, so a run that
+        # died in between left rows and tombstones that no index version
+        # reflects. Roll them back; re-running the same upsert redoes them.
+        if "records" in self.manifest:
+            records, deleted = self.manifest["records"], self.manifest["deleted"]
+        else:
+            records = deleted = None
+        self.writer = RecipeStoreWriter(self.store_path, records=records, deleted=deleted)
+        store = RecipeStore(self.store_path)
+        keys, hashes = store.hashes()
+        live = np.flatnonzero(~store.deleted)
+        self._by_key = dict(zip(keys[live].tolist(), live.tolist()))
+        self._content = hashes.tolist()
+
+        self._model = model
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.stats = Counter()
+
+    def _pin_build(self):
+        # First run on build_index.py output: the store must hold exactly the
+        # indexed recipes. Record that in a version 0 manifest before changing
+        # anything, so a run that dies before its first commit rolls back to it.
+        store = RecipeStore(self.store_path)
+        if len(store) != self.index.ntotal or store.deleted.any():
+            raise SystemExit(
+                f"recipe_store has {len(store)} recipes ({int(store.deleted.sum())} deleted) "
+                f"but recipe_faiss.index has {self.index.ntotal}; "
+                "rebuild both with build_index.py --fresh"
+            )
+        self.manifest = dict(self.manifest, records=len(store), deleted=0)
+        write_manifest(self.artifacts_dir, self.manifest)
+
+    @property
+    def model(self):
+        if self._model is None:
+            from sentence_transformers import SentenceTransformer
+
+            self._model = SentenceTransformer(self.model_name)
+        return self._model
+
+    def _remove(self, ids):
+        self.writer.delete(ids)
+        self.index.remove_ids(np.asarray(ids, dtype="int64"))
+
+    def upsert(self, records):
+        pending = {}
+        for record in records:
+            key, content = record_hashes(record, self.writer.columns)
+            old = self._by_key.get(key)
+            if old is not None and self._content[old] == content:
+                self.stats["unchanged"] += 1
+                continue
+            pending[key] = (record, content, old)
+        if not pending:
+            return []
+
+        replaced = [old for _, _, old in pending.values() if old is not None]
+        self.stats["updated"] += len(replaced)
+        self.stats["added"] += len(pending) - len(replaced)
+        if replaced:
+            self._remove(replaced)
+
+        new_records = [record for record, _, _ in pending.values()]
+        ids = self.writer.append(new_records)
+        vectors = self.model.encode(
+            [recipe_text(r) for r in new_records],
+            batch_size=self.batch_size,
+            convert_to_numpy=True,
+        )
+        self.index.add_with_ids(
+            np.ascontiguousarray(vectors, dtype="float32"), np.asarray(ids, dtype="int64")
+        )
+        for key, recipe_id, (_, content, _) in zip(pending, ids, pending.values()):
+            self._by_key[key] = recipe_id
+            self._content.append(content)
+        return ids
+
+    def delete(self, keys):
+        ids = [self._by_key.pop(_hash64(key)) for key in keys if _hash64(key) in self._by_key]
+        if ids:
+            self._remove(ids)
+        self.stats["deleted"] += len(ids)
+        return ids
+
+    def commit(self, rebuild_aux=False):
+        import faiss
+
+        from ingredient_search import build_ingredient_index
+        from lexical_index import build_lexical_index
+        from recipe_cards import build_recipe_cards
+
+        version = self.manifest.get("version", 0)
+        if not any(self.stats[k] for k in ("added", "updated", "deleted")):
+            return version  # nothing changed; keep running engines and their caches
+        self.writer.flush()
+        version += 1
+        manifest = dict(
+            self.manifest, version=version, records=self.writer.count, deleted=self.writer.deleted_count
+        )
+
+        index_name = f"recipe_faiss.v{version}.index"
+        index_path = os.path.join(self.artifacts_dir, index_name)
+        faiss.write_index(self.index, index_path + ".tmp")
+        os.replace(index_path + ".tmp", index_path)
+        manifest["recipe_faiss.index"] = index_name
+
+        shards_path = artifact_path(self.artifacts_dir, "recipe_shards", self.manifest)
+        if os.path.isdir(shards_path):
+            from sharded_index import ShardedIndex, index_vectors, write_shards
+
+            n_shards = ShardedIndex(shards_path, workers=0).n_shards
+            vectors, ids = index_vectors(self.index)
+            write_shards(vectors, ids, os.path.join(self.artifacts_dir, f"recipe_shards.v{version}"), n_shards)
+            manifest["recipe_shards"] = f"recipe_shards.v{version}"
+
+        # Cards are keyed by id and only ever appended, like the store itself.
+        cards_path = os.path.join(self.artifacts_dir, "recipe_cards")
+        if os.path.isdir(cards_path):
+            build_recipe_cards(RecipeStore(self.store_path), cards_path, extend=True)
+
+        # Lexical / ingredient indexes are rebuilt over the whole corpus, so
+        # only on request; until then the engine skips their deleted ids and
+        # finds new recipes through FAISS alone. They go into fresh
+        # directories because readers keep the old ones mmapped.
+        if rebuild_aux:
+            store = RecipeStore(self.store_path)
+            for name, build in [
+                ("lexical_index", build_lexical_index),
+                ("ingredient_index", build_ingredient_index),
+            ]:
+                if os.path.isdir(artifact_path(self.artifacts_dir, name, self.manifest)):
+                    build(store, os.path.join(self.artifacts_dir, f"{name}.v{version}"))
+                    manifest[name] = f"{name}.v{version}"
+
+        write_manifest(self.artifacts_dir, manifest)
+        self.manifest = manifest
+        self._cleanup(version)
+        return version
+
+    def _cleanup(self, version):
+        # Keep the previous version for engines that have not reloaded yet.
+        for path in glob.glob(os.path.join(self.artifacts_dir, "*.v*")):
+            suffix = os.path.basename(path).split(".v")[-1].split(".")[0]
+            if suffix.isdigit() and int(suffix) < version - 1:
+                if os.path.isdir(path):
+                    shutil.rmtree(path)
+                else:
+                    os.remove(path)
+
+    def close(self):
+        self.writer.close()
+
+
+def main(argv=None):
+    import pandas as pd
+
+    from build_index import clean_chunk
+
+    parser = argparse.ArgumentParser(description="Add, update or delete recipes in place")
+    parser.add_argument("--artifacts", default=".")
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument(
+        "--rebuild-aux", action="store_true", help="also rebuild the lexical/ingredient indexes"
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+    upsert = sub.add_parser("upsert", help="add new recipes and update changed ones")
+    upsert.add_argument("source", help="CSV in the RecipeNLG format")
+    upsert.add_argument("--chunksize", type=int, default=10000)
+    delete = sub.add_parser("delete", help="delete recipes by link (or title)")
+    delete.add_argument("keys", nargs="+")
+    args = parser.parse_args(argv)
+
+    ingestor = RecipeIngestor(args.artifacts, model_name=args.model)
+    if args.command == "upsert":
+        for chunk in pd.read_csv(args.source, chunksize=args.chunksize, dtype=str):
+            ingestor.upsert(clean_chunk(chunk).to_dict("records"))
+    else:
+        ingestor.delete(args.keys)
+    version = ingestor.commit(rebuild_aux=args.rebuild_aux)
+    ingestor.close()
+    print(f"version {version}: {dict(ingestor.stats)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""\"What can I cook\" search: rank recipes by how much of them is in your fridge.
+
+Every recipe's NER ingredients are mapped to vocabulary ids and stored as one
+CSR matrix (recipe_ptr / item_ids), so scoring the whole corpus is a NumPy
+gather plus a cumulative sum. Build it from a recipe store with:
+    python ingredient_search.py recipe_store ingredient_index
+"""
+import os
+import re
+import sys
+from array import array
+
+import numpy as np
+
+_WORD = re.compile(r"[a-z]+")
+DESCRIPTORS = {
+    "chopped", "diced", "dried", "fresh", "frozen", "grated", "grnd", "ground",
+    "large", "medium", "minced", "shredded", "sliced", "small", "whole",
+}
+FILLER = {"a", "and", "any", "cook", "can", "got", "have", "i", "in", "make", "my",
+          "of", "or", "some", "something", "the", "what", "with", "fridge"}
+# Matched exactly, not by word: "pepper" must not cover "cayenne pepper".
+PANTRY = {"salt", "pepper", "black pepper", "water", "oil", "vegetable oil",
+          "olive oil", "sugar", "flour", "butter"}
+
+
+def singular(word):
+    if len(word) > 4 and word.endswith("oes"):
+        return word[:-2]
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def normalize_ingredient(text):
+    words = [singular(w) for w in _WORD.findall(text.lower())]
+    return " ".join(w for w in words if w not in DESCRIPTORS)
+
+
+def split_ingredients(ner):
+    # build_index.py keeps NER items comma separated; the notebook's pickle
+    # joined them with spaces, so fall back to single words there.
+    if not isinstance(ner, str):
+        return []
+    parts = ner.split(",") if "," in ner else ner.split()
+    items = (normalize_ingredient(p) for p in parts)
+    return [item for item in dict.fromkeys(items) if item]
+
+
+def build_ingredient_index(store, path):
+    vocab = {}
+    item_ids = array("i")
+    recipe_ptr = array("q", [0])
+    for recipe_id, recipe in enumerate(store):
+        items = [] if store.is_deleted(recipe_id) else split_ingredients(recipe["NER"])
+        ids = sorted({vocab.setdefault(item, len(vocab)) for item in items})
+        item_ids.extend(ids)
+        recipe_ptr.append(len(item_ids))
+
+    os.makedirs(path, exist_ok=True)
+    np.save(os.path.join(path, "recipe_ptr.npy"), np.frombuffer(recipe_ptr, dtype="int64"))
+    np.save(os.path.join(path, "item_ids.npy"), np.frombuffer(item_ids, dtype="int32"))
+    with open(os.path.join(path, "vocab.txt"), "w", encoding="utf-8") as f:
+        f.write("\n".join(sorted(vocab, key=vocab.get)))
+    return IngredientIndex(path)
+
+
+class IngredientIndex:
+    def __init__(self, path):
+        self.recipe_ptr = np.load(os.path.join(path, "recipe_ptr.npy"), mmap_mode="r")
+        self.item_ids = np.load(os.path.join(path, "item_ids.npy"), mmap_mode="r")
+        with open(os.path.join(path, "vocab.txt"), encoding="utf-8") as f:
+            self.items = [t for t in f.read().split("\n") if t]
+        self.vocab = {item: i for i, item in enumerate(self.items)}
+        # word -> vocab ids containing it, used to expand "chicken" to "chicken breast"
+        self._by_word = {}
+        for i, item in enumerate(self.items):
+            for word in item.split():
+                self._by_word.setdefault(word, []).append(i)
+        self.sizes = np.diff(self.recipe_ptr)
+        pantry = {self.vocab.get(normalize_ingredient(item)) for item in PANTRY} - {None}
+        self.pantry_ids = np.fromiter(pantry, dtype="int64", count=len(pantry))
+
+    def __len__(self):
+        return len(self.sizes)
+
+    def expand(self, ingredients):
+        ids = set()
+        for ingredient in ingredients:
+            words = normalize_ingredient(ingredient).split()
+            if not words:
+                continue
+            candidates = set(self._by_word.get(words[0], []))
+            for word in words[1:]:
+                candidates &= set(self._by_word.get(word, []))
+            ids |= candidates
+        return np.fromiter(ids, dtype="int64", count=len(ids))
+
+    def parse(self, text):
+        # Split free text into known ingredients and leftover words,
+        # e.g. "something spicy with chicken and rice" -> ["chicken", "rice"], "spicy"
+        words = [w for w in _WORD.findall(text.lower()) if w not in FILLER]
+        found, rest = [], []
+        i = 0
+        while i < len(words):
+            for n in (3, 2, 1):
+                phrase = normalize_ingredient(" ".join(words[i : i + n]))
+                if len(words[i : i + n]) == n and phrase in self.vocab:
+                    found.append(phrase)
+                    i += n
+                    break
+            else:
+                if singular(words[i]) in self._by_word:
+                    found.append(singular(words[i]))
+                else:
+                    rest.append(words[i])
+                i += 1
+        return found, " ".join(rest)
+
+    def _row_sums(self, mask):
+        hits = np.concatenate([[0], np.cumsum(mask[self.item_ids], dtype="int64")])
+        return hits[self.recipe_ptr[1:]] - hits[self.recipe_ptr[:-1]]
+
+    def coverage(self, ingredients, assume_pantry=True):
+        # Per recipe: how many of its ingredients you have, and how many of
+        # those come from the list you typed (pantry staples excluded).
+        listed = np.zeros(len(self.items), dtype=bool)
+        listed[self.expand(ingredients)] = True
+        have = listed.copy()
+        if assume_pantry:
+            have[self.pantry_ids] = True
+        return self._row_sums(have), self._row_sums(listed)
+
+    def search(self, ingredients, top_k=5, candidates=None, assume_pantry=True):
+        counts, listed = self.coverage(ingredients, assume_pantry)
+        score = np.where(listed > 0, counts / np.maximum(self.sizes, 1), 0.0)
+        if candidates is not None:
+            # Keep the semantic ranking as the tie-breaker.
+            candidates = np.asarray(candidates, dtype="int64")
+            ids = candidates[np.argsort(-score[candidates], kind="stable")]
+        else:
+            k = min(top_k, len(score))
+            if not k:
+                return []
+            ids = np.argpartition(-score, k - 1)[:k]
+            ids = ids[np.lexsort((-counts[ids], -score[ids]))]
+        ids = [int(i) for i in ids if score[i] > 0][:top_k]
+        return [(i, int(counts[i]), int(self.sizes[i])) for i in ids]
+
+    def missing(self, recipe_id, ingredients, assume_pantry=True):
+        have = set(self.expand(ingredients).tolist())
+        if assume_pantry:
+            have |= set(self.pantry_ids.tolist())
+        start, end = self.recipe_ptr[recipe_id], self.recipe_ptr[recipe_id + 1]
+        return [self.items[i] for i in self.item_ids[start:end] if i not in have]
+
+
+def what_can_i_cook(text, ingredients, top_k=5, semantic=None, candidates=200):
+    # semantic(query, n) -> FAISS ids, used to narrow the pool for words
+    # that are not ingredients ("something spicy with chicken and rice").
+    found, rest = ingredients.parse(text)
+    if not found:
+        return found, []
+    pool = semantic(rest, candidates) if semantic is not None and rest else None
+    return found, ingredients.search(found, top_k, pool)
+
+
+if __name__ == "__main__":
+    from recipe_store import RecipeStore
+
+    if len(sys.argv) != 3:
+        raise SystemExit("usage: python ingredient_search.py recipe_store ingredient_index")
+    ingredients = build_ingredient_index(RecipeStore(sys.argv[1]), sys.argv[2])
+    print(f"indexed {len(ingredients)} recipes, {len(ingredients.items)} ingredients")
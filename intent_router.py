@@ -0,0 +1,143 @@
+"""Table-driven intent routing for chat messages.
+
+Keyword phrases of every intent are indexed by their first word, so a message
+is tokenized once and each token costs one dict lookup, however many intents
+there are (a word-level Aho-Corasick without failure links; phrases are at
+most a few words). The highest-priority intent found wins, and the keywords
+plus leading filler ("give me", "i want to", ...) are removed to leave the
+recipe query:
+
+    >>> route("give me pizza ingredients")
+    ('ingredients', 'pizza')
+    >>> route("yes", mode="ask_another")
+    ('yes', '')
+"""
+import re
+
+# (intent, keyword phrases, whether the rest of the message is a recipe query)
+# in priority order. Matching is on whole words, so "hi" does not fire inside
+# "chicken". fridge ranks below the recipe intents: "how to make fridge cake"
+# and "what ingredients do i have to buy" are recipe requests.
+INTENTS = [
+    ("ingredients", ["ingredient", "ingredients"], True),
+    ("steps", ["step", "steps", "direction", "directions"], True),
+    ("how_to", ["how to", "make"], True),
+    ("fridge", ["what can i cook", "what can i make", "i have", "fridge"], False),
+    ("greeting", ["hello", "hi", "hai", "hey"], False),
+    ("thanks", ["thank", "thanks"], False),
+]
+FALLBACK = "help"
+
+# Dropped around a keyword: "the cooking steps for lasagna" -> "lasagna"
+BEFORE_KEYWORD = {"the", "cooking"}
+AFTER_KEYWORD = {"for", "of", "in", "to"}
+LEADING_FILLER = [
+    "hi", "hello", "hey", "hai", "please", "pls", "can you", "could you", "check",
+    "find", "give me", "show me", "tell me", "what are", "what is", "i want to",
+    "i have a question",
+    "i would like to", "i'd like to", "i wanna", "let me see", "me", "the", "a",
+]
+TRAILING_FILLER = {"please", "pls"}
+YES = {"yes", "yeah", "yep", "sure", "ok", "okay", "y"}
+NO = {"no", "nope", "nah", "stop", "enough"}
+
+_TOKEN = re.compile(r"[\w']+")
+
+
+def _phrase_table(phrases):
+    # first word -> [(phrase tokens, value)], longest phrase first
+    table = {}
+    for phrase, value in phrases:
+        words = tuple(phrase.split())
+        table.setdefault(words[0], []).append((words, value))
+    for candidates in table.values():
+        candidates.sort(key=lambda c: -len(c[0]))
+    return table
+
+
+def _match_at(table, tokens, i):
+    for words, value in table.get(tokens[i], ()):
+        if tuple(tokens[i : i + len(words)]) == words:
+            return words, value
+    return None, None
+
+
+class IntentRouter:
+    def __init__(self, intents, fallback=FALLBACK):
+        self.priority = {name: rank for rank, (name, _, _) in enumerate(intents)}
+        self.has_query = {name: has_query for name, _, has_query in intents}
+        self.fallback = fallback
+        self._keywords = _phrase_table(
+            (phrase, name) for name, phrases, _ in intents for phrase in phrases
+        )
+        self._filler = _phrase_table((phrase, True) for phrase in LEADING_FILLER)
+
+    def scan(self, tokens):
+        # Returns (best intent, [(start, end, intent), ...] for every keyword).
+        best, spans = None, []
+        i = 0
+        while i < len(tokens):
+            words, name = _match_at(self._keywords, tokens, i)
+            if words is None:
+                i += 1
+                continue
+            if best is None or self.priority[name] < self.priority[best]:
+                best = name
+            spans.append((i, i + len(words), name))
+            i += len(words)
+        return best or self.fallback, spans
+
+    def query(self, tokens, spans, strip_filler=True):
+        drop = set()
+        for start, end, _ in spans:
+            drop.update(range(start, end))
+            before = start - 1
+            while before >= 0 and tokens[before] in BEFORE_KEYWORD:
+                drop.add(before)
+                before -= 1
+            if end < len(tokens) and tokens[end] in AFTER_KEYWORD:
+                drop.add(end)
+        words = [t for i, t in enumerate(tokens) if i not in drop]
+        if not strip_filler:
+            return " ".join(words)
+
+        start = 0
+        while start < len(words):
+            filler, _ = _match_at(self._filler, words, start)
+            if filler is None:
+                break
+            start += len(filler)
+        end = len(words)
+        while end > start and words[end - 1] in TRAILING_FILLER:
+            end -= 1
+        return " ".join(words[start:end])
+
+    def route(self, message, mode="menu"):
+        # Returns (intent, query). A mode set by the previous turn takes
+        # precedence: after "Check Ingredients", any text is a recipe name.
+        if mode == "waiting_fridge":
+            return "fridge", message
+        tokens = _TOKEN.findall(message.lower())
+        if mode == "ask_another":
+            # "okay no more" is a no: a yes word must lead and nothing may refuse.
+            yes = bool(tokens) and tokens[0] in YES and not NO.intersection(tokens)
+            return ("yes" if yes else "no"), ""
+        if mode in ("waiting_ingredient", "waiting_direction"):
+            # The whole message is a dish name ("a la king chicken"), apart
+            # from a repeated "ingredients for" / "steps for".
+            intent = "ingredients" if mode == "waiting_ingredient" else "steps"
+            _, spans = self.scan(tokens)
+            spans = [span for span in spans if span[2] == intent]
+            return intent, self.query(tokens, spans, strip_filler=False) or " ".join(tokens)
+
+        intent, spans = self.scan(tokens)
+        if intent == "fridge":
+            return intent, message
+        if not self.has_query.get(intent):
+            return intent, ""
+        # Fridge words left in a recipe request belong to the dish name.
+        return intent, self.query(tokens, [span for span in spans if span[2] != "fridge"])
+
+
+ROUTER = IntentRouter(INTENTS)
+route = ROUTER.route
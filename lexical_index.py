@@ -0,0 +1,172 @@
+"""BM25 inverted index over recipe titles and NER ingredients.
+
+Postings are kept CSR-style in flat NumPy arrays (one .npy file each, opened
+with mmap), so the index is compact and shared through the page cache like
+the recipe store. Build it from a recipe store with:
+    python lexical_index.py recipe_store lexical_index
+"""
+import hashlib
+import os
+import re
+import sys
+from array import array
+
+import numpy as np
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+STOPWORDS = {"a", "an", "and", "for", "how", "i", "in", "make", "me", "of", "the", "to", "with"}
+
+
+def tokenize(text):
+    return [t for t in _TOKEN.findall(text.lower()) if t not in STOPWORDS]
+
+
+def title_key(text):
+    return " ".join(_TOKEN.findall(text.lower()))
+
+
+def _hash(key):
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def reciprocal_rank_fusion(rankings, k=60):
+    scores = {}
+    for ranking in rankings:
+        for rank, idx in enumerate(ranking):
+            idx = int(idx)
+            scores[idx] = scores.get(idx, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+def build_lexical_index(store, path, title_weight=2):
+    vocab = {}
+    term_ids, doc_ids, tfs = array("i"), array("i"), array("H")
+    doc_len = array("H")
+    title_hashes, title_docs = array("Q"), array("i")
+
+    for doc_id, recipe in enumerate(store):
+        if store.is_deleted(doc_id):
+            doc_len.append(0)
+            continue
+        title = recipe["title"] if isinstance(recipe["title"], str) else ""
+        ner = recipe["NER"] if isinstance(recipe["NER"], str) else ""
+        counts = {}
+        for token in tokenize(title):
+            counts[token] = counts.get(token, 0) + title_weight
+        for token in tokenize(ner):
+            counts[token] = counts.get(token, 0) + 1
+        for token, tf in counts.items():
+            term_ids.append(vocab.setdefault(token, len(vocab)))
+            doc_ids.append(doc_id)
+            tfs.append(min(tf, 65535))
+        doc_len.append(min(sum(counts.values()), 65535))
+        title_hashes.append(_hash(title_key(title)))
+        title_docs.append(doc_id)
+
+    term_ids = np.frombuffer(term_ids, dtype="int32")
+    order = np.argsort(term_ids, kind="stable")
+    term_ptr = np.zeros(len(vocab) + 1, dtype="int64")
+    np.cumsum(np.bincount(term_ids, minlength=len(vocab)), out=term_ptr[1:])
+
+    title_hashes = np.frombuffer(title_hashes, dtype="uint64")
+    title_order = np.argsort(title_hashes, kind="stable")
+
+    os.makedirs(path, exist_ok=True)
+    np.save(os.path.join(path, "term_ptr.npy"), term_ptr)
+    np.save(os.path.join(path, "doc_ids.npy"), np.frombuffer(doc_ids, dtype="int32")[order])
+    np.save(os.path.join(path, "tfs.npy"), np.frombuffer(tfs, dtype="uint16")[order])
+    np.save(os.path.join(path, "doc_len.npy"), np.frombuffer(doc_len, dtype="uint16"))
+    np.save(os.path.join(path, "title_hashes.npy"), title_hashes[title_order])
+    np.save(os.path.join(path, "title_ids.npy"), np.frombuffer(title_docs, dtype="int32")[title_order])
+    with open(os.path.join(path, "vocab.txt"), "w", encoding="utf-8") as f:
+        f.write("\n".join(sorted(vocab, key=vocab.get)))
+    return LexicalIndex(path)
+
+
+class LexicalIndex:
+    def __init__(self, path, k1=1.2, b=0.75, min_idf=0.2):
+        def load(name):
+            return np.load(os.path.join(path, name + ".npy"), mmap_mode="r")
+
+        self.term_ptr = load("term_ptr")
+        self.doc_ids = load("doc_ids")
+        self.tfs = load("tfs")
+        self.doc_len = load("doc_len")
+        self.title_hashes = load("title_hashes")
+        self.title_ids = load("title_ids")
+        with open(os.path.join(path, "vocab.txt"), encoding="utf-8") as f:
+            terms = f.read().split("\n")
+        self.vocab = {t: i for i, t in enumerate(terms) if t}
+        self.n_docs = len(self.doc_len)
+        self.avg_len = float(np.mean(self.doc_len)) if self.n_docs else 1.0
+        self.k1 = k1
+        self.b = b
+        # Terms in over ~80% of recipes ("salt") barely change the ranking
+        # but have the longest posting lists; they are skipped when the
+        # query has rarer terms.
+        self.min_idf = min_idf
+
+    def exact_title(self, query):
+        # Fast path: recipes whose normalized title equals the query.
+        key = _hash(title_key(query))
+        lo = np.searchsorted(self.title_hashes, key, side="left")
+        hi = np.searchsorted(self.title_hashes, key, side="right")
+        return np.asarray(self.title_ids[lo:hi], dtype="int64")
+
+    def _terms(self, query):
+        terms = []
+        for token in dict.fromkeys(tokenize(query)):
+            term = self.vocab.get(token)
+            if term is None:
+                continue
+            start, end = int(self.term_ptr[term]), int(self.term_ptr[term + 1])
+            df = end - start
+            terms.append((np.log1p((self.n_docs - df + 0.5) / (df + 0.5)), start, end))
+        if any(idf >= self.min_idf for idf, _, _ in terms):
+            terms = [t for t in terms if t[0] >= self.min_idf]
+        return terms
+
+    def _scores(self, idf, start, end):
+        docs = self.doc_ids[start:end]
+        tf = self.tfs[start:end].astype("float32")
+        norm = self.k1 * (1 - self.b + self.b * self.doc_len[docs] / self.avg_len)
+        return docs, (idf * tf * (self.k1 + 1) / (tf + norm)).astype("float32")
+
+    def search(self, query, top_k=10):
+        terms = self._terms(query)
+        postings = sum(end - start for _, start, end in terms)
+        if not postings:
+            return np.empty(0, dtype="int64"), np.empty(0, dtype="float32")
+
+        if postings * 8 < self.n_docs:
+            # Short posting lists: merge only the documents they touch.
+            parts = [self._scores(*term) for term in terms]
+            candidates, inverse = np.unique(np.concatenate([d for d, _ in parts]), return_inverse=True)
+            totals = np.bincount(inverse, weights=np.concatenate([s for _, s in parts]))
+        else:
+            # Long lists (common ingredients): a dense score per recipe is
+            # cheaper than sorting millions of postings. A term lists each
+            # document once, so fancy-index += does not drop updates.
+            totals = np.zeros(self.n_docs, dtype="float32")
+            for term in terms:
+                docs, scores = self._scores(*term)
+                totals[docs] += scores
+            candidates = None
+
+        if len(totals) > top_k:
+            top = np.argpartition(-totals, top_k)[:top_k]
+        else:
+            top = np.arange(len(totals))
+        top = top[totals[top] > 0]
+        top = top[np.argsort(-totals[top], kind="stable")]
+        ids = top if candidates is None else candidates[top]
+        return ids.astype("int64"), totals[top].astype("float32")
+
+
+if __name__ == "__main__":
+    from recipe_store import RecipeStore
+
+    if len(sys.argv) != 3:
+        raise SystemExit("usage: python lexical_index.py recipe_store lexical_index")
+    lexical = build_lexical_index(RecipeStore(sys.argv[1]), sys.argv[2])
+    print(f"indexed {lexical.n_docs} recipes, {len(lexical.vocab)} terms")
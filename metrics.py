@@ -0,0 +1,187 @@
+"""Lightweight stage timings for the chat and retrieval hot paths.
+
+    with span("encode"):
+        vector = model.encode([query])
+
+Each stage gets a fixed-bucket latency histogram, so recording is a bisect
+and two additions under a lock. RECIPE_METRICS_SAMPLE (0..1, default 1)
+times only a fraction of calls; RECIPE_METRICS_SAMPLE=0 turns spans into a
+single random() call. Cache hit rates and other live values are read when
+exported rather than tracked per call.
+
+Export:
+    prometheus_text()           Prometheus text format (service.py /metrics)
+    snapshot() / write_json()   per-stage count, mean and p50/p95/p99
+    serve(port)                 /metrics over HTTP from any process (app.py)
+"""
+import bisect
+import json
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Upper bounds in seconds, spanning a cached lookup to a cold model load.
+BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+    0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+PREFIX = "recipe"
+
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        # Upper bound of the bucket holding the q-th observation.
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(self.buckets, self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+class Metrics:
+    def __init__(self, sample_rate=1.0):
+        self.sample_rate = sample_rate
+        self.stages = {}
+        self.counters = {}
+        self.gauges = {}
+        self._lock = threading.Lock()
+        self._last_dump = 0.0
+
+    @contextmanager
+    def span(self, stage):
+        if not self.sampled():
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def sampled(self):
+        # RECIPE_METRICS_SAMPLE: share of spans that are timed.
+        return self.sample_rate >= 1.0 or random.random() < self.sample_rate
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            histogram = self.stages.get(stage)
+            if histogram is None:
+                histogram = self.stages[stage] = Histogram()
+            histogram.observe(seconds)
+
+    def incr(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def gauge(self, name, fn, help=""):
+        # fn() is called at export time, e.g. a cache's current hit rate.
+        self.gauges[name] = (fn, help)
+
+    def _gauge_values(self):
+        values = {}
+        for name, (fn, _) in list(self.gauges.items()):
+            try:
+                values[name] = float(fn())
+            except Exception:
+                continue
+        return values
+
+    def snapshot(self):
+        with self._lock:
+            stages = {
+                stage: {
+                    "count": h.count,
+                    "sampled": self.sample_rate < 1.0,
+                    "mean_ms": h.sum / h.count * 1000 if h.count else 0.0,
+                    "p50_ms": h.quantile(0.50) * 1000,
+                    "p95_ms": h.quantile(0.95) * 1000,
+                    "p99_ms": h.quantile(0.99) * 1000,
+                }
+                for stage, h in sorted(self.stages.items())
+            }
+            counters = dict(self.counters)
+        return {"stages": stages, "counters": counters, "gauges": self._gauge_values()}
+
+    def prometheus_text(self):
+        lines = [
+            f"# HELP {PREFIX}_stage_seconds Time spent in each chat/retrieval stage.",
+            f"# TYPE {PREFIX}_stage_seconds histogram",
+        ]
+        with self._lock:
+            for stage, h in sorted(self.stages.items()):
+                cumulative = 0
+                for bound, n in zip(h.buckets, h.counts):
+                    cumulative += n
+                    lines.append(f'{PREFIX}_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+                lines.append(f'{PREFIX}_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {h.count}')
+                lines.append(f'{PREFIX}_stage_seconds_sum{{stage="{stage}"}} {h.sum:.6f}')
+                lines.append(f'{PREFIX}_stage_seconds_count{{stage="{stage}"}} {h.count}')
+            counters = dict(self.counters)
+        for name, value in sorted(counters.items()):
+            lines.append(f"# TYPE {PREFIX}_{name}_total counter")
+            lines.append(f"{PREFIX}_{name}_total {value}")
+        for name, value in sorted(self._gauge_values().items()):
+            help_text = self.gauges[name][1]
+            if help_text:
+                lines.append(f"# HELP {PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {PREFIX}_{name} gauge")
+            lines.append(f"{PREFIX}_{name} {value}")
+        return "\n".join(lines) + "\n"
+
+    def write_json(self, path):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.snapshot(), f, indent=2)
+        os.replace(tmp_path, path)
+
+    def maybe_write_json(self, path, interval=10.0):
+        # Cheap to call on every Streamlit rerun; writes at most every interval.
+        now = time.monotonic()
+        if path and now - self._last_dump >= interval:
+            self._last_dump = now
+            self.write_json(path)
+
+    def serve(self, port, host="127.0.0.1"):
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] == "/metrics.json":
+                    body, content_type = json.dumps(metrics.snapshot()), "application/json"
+                else:
+                    body, content_type = metrics.prometheus_text(), "text/plain; version=0.0.4"
+                body = body.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        return server
+
+
+METRICS = Metrics(sample_rate=float(os.environ.get("RECIPE_METRICS_SAMPLE", 1.0)))
+span = METRICS.span
@@ -0,0 +1,142 @@
+"""Export a quantized MiniLM encoder and validate it against the fp32 index.
+
+    python quantize_encoder.py export --out model_int8
+    python quantize_encoder.py validate --backend onnx-int8 --model model_int8
+    python quantize_encoder.py validate --backend torch-int8
+
+validate re-encodes a sample of recipes with the candidate backend and
+compares them with the fp32 vectors stored in the current recipe_faiss.index
+of --artifacts (cosine drift; deleted recipes are not sampled). It then runs recipe titles as queries through both encoders and
+reports top-k retrieval agreement and per-query latency. It exits non-zero
+when drift or agreement is below the given thresholds.
+"""
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+
+from encoder_backends import ENCODER_BACKENDS, export_onnx_int8, load_encoder
+from engine import DEFAULT_MODEL, load_store
+from ingest import artifact_path, read_manifest
+from recipe_store import recipe_text
+
+
+def stored_vectors(args, index, ids):
+    if args.embeddings:
+        data = np.memmap(args.embeddings, dtype="float32", mode="r").reshape(-1, args.dim)
+        return np.asarray(data[ids])
+    return np.stack([index.reconstruct(int(i)) for i in ids])
+
+
+def cosine(a, b):
+    a = a / np.linalg.norm(a, axis=1, keepdims=True)
+    b = b / np.linalg.norm(b, axis=1, keepdims=True)
+    return np.sum(a * b, axis=1)
+
+
+def latency_ms(model, queries):
+    times = []
+    for query in queries:
+        start = time.perf_counter()
+        model.encode([query])
+        times.append(time.perf_counter() - start)
+    times = np.asarray(times) * 1000
+    return {"p50": float(np.percentile(times, 50)), "p99": float(np.percentile(times, 99))}
+
+
+def validate(args):
+    import faiss
+
+    store = load_store(args.artifacts)
+    index_path = args.index or artifact_path(args.artifacts, "recipe_faiss.index", read_manifest(args.artifacts))
+    index = faiss.read_index(index_path)
+    # Deleted and replaced recipes have no vector in an ingested index.
+    live = np.flatnonzero(~store.deleted)
+    rng = np.random.default_rng(args.seed)
+    ids = np.sort(rng.choice(live, min(args.samples, len(live)), replace=False))
+
+    reference = load_encoder(DEFAULT_MODEL)
+    candidate = load_encoder(args.model, args.backend, args.file)
+
+    # 1. Document drift against the fp32 vectors the index was built from.
+    texts = [recipe_text(store[int(i)]) for i in ids]
+    drift = cosine(
+        stored_vectors(args, index, ids),
+        np.asarray(candidate.encode(texts, batch_size=64), dtype="float32"),
+    )
+
+    # 2. Query-side retrieval agreement, using titles as queries.
+    queries = [store[int(i)]["title"] for i in ids[: args.queries]]
+    _, ref_ids = index.search(np.asarray(reference.encode(queries), dtype="float32"), args.k)
+    _, cand_ids = index.search(np.asarray(candidate.encode(queries), dtype="float32"), args.k)
+    overlap = [len(set(a) & set(b)) / args.k for a, b in zip(ref_ids.tolist(), cand_ids.tolist())]
+
+    report = {
+        "backend": args.backend,
+        "model": args.model,
+        "documents": len(ids),
+        "queries": len(queries),
+        "cosine_mean": float(drift.mean()),
+        "cosine_min": float(drift.min()),
+        "cosine_p01": float(np.percentile(drift, 1)),
+        f"overlap_at_{args.k}": float(np.mean(overlap)),
+        "top1_agreement": float(np.mean(ref_ids[:, 0] == cand_ids[:, 0])),
+        "latency_ms_fp32": latency_ms(reference, queries[:100]),
+        "latency_ms_candidate": latency_ms(candidate, queries[:100]),
+    }
+    print(json.dumps(report, indent=2))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+    failed = report["cosine_p01"] < args.min_cosine or report[f"overlap_at_{args.k}"] < args.min_overlap
+    if failed:
+        print(
+            f"FAILED: cosine_p01 must be >= {args.min_cosine} and "
+            f"overlap@{args.k} >= {args.min_overlap}",
+            file=sys.stderr,
+        )
+    return 1 if failed else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export and validate quantized encoders")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    export = sub.add_parser("export", help="write an int8 ONNX export of MiniLM")
+    export.add_argument("--model", default=DEFAULT_MODEL)
+    export.add_argument("--out", required=True)
+    export.add_argument("--config", default="avx512", help="avx512, avx512_vnni, avx2 or arm64")
+
+    check = sub.add_parser("validate", help="compare a backend with the fp32 index")
+    check.add_argument("--backend", choices=ENCODER_BACKENDS, required=True)
+    check.add_argument("--model", default=DEFAULT_MODEL, help="model name or export directory")
+    check.add_argument("--file", help="ONNX file inside the model, e.g. onnx/model_qint8_avx512.onnx")
+    check.add_argument("--artifacts", default=".")
+    check.add_argument("--index", help="FAISS index file (default: the manifest's index in --artifacts)")
+    check.add_argument("--embeddings", help="build/embeddings.f32, for non-flat indexes")
+    check.add_argument("--dim", type=int, default=384)
+    check.add_argument("--samples", type=int, default=2000)
+    check.add_argument("--queries", type=int, default=500)
+    check.add_argument("--k", type=int, default=5)
+    check.add_argument("--min-cosine", type=float, default=0.98)
+    check.add_argument("--min-overlap", type=float, default=0.9)
+    check.add_argument("--seed", type=int, default=42)
+    check.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args(argv)
+
+    if args.command == "export":
+        file_name = export_onnx_int8(args.model, args.out, args.config)
+        print(
+            f"wrote {args.out}/{file_name}; run the app with "
+            f"RECIPE_ENCODER_BACKEND=onnx-int8 RECIPE_ENCODER_MODEL={args.out} "
+            f"RECIPE_ENCODER_FILE={file_name}"
+        )
+        return 0
+    return validate(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
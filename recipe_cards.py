@@ -0,0 +1,81 @@
+"""Pre-rendered recipe cards, stored alongside the recipe store.
+
+The chat answers show a recipe's ingredients as a markdown list and its
+directions as numbered steps. Formatting the raw stringified lists on every
+request is repeated work, so the build renders both once into recipe_cards/,
+a second offset-indexed store with the same ids as recipe_store/. Build it
+from an existing store with:
+    python recipe_cards.py recipe_store recipe_cards
+"""
+import os
+import sys
+
+from recipe_store import RecipeStore, RecipeStoreWriter, _read_meta
+
+CARD_COLUMNS = ["ingredients", "steps"]
+
+
+def format_list(raw_text):
+    if isinstance(raw_text, str):
+        cleaned_text = raw_text.strip("[]").replace('"', "").replace("'", "")
+        items = [x.strip() for x in cleaned_text.split(",") if x.strip()]
+        return "\n".join([f"- {i}" for i in items])
+    return raw_text
+
+
+def format_steps(raw_text):
+    if isinstance(raw_text, str):
+        items = [x.strip() for x in raw_text.split(". ") if x.strip()]
+        return "\n".join([f"{idx+1}. {i}" for idx, i in enumerate(items)])
+    return raw_text
+
+
+def render_card(recipe):
+    return {
+        "ingredients": format_list(recipe["ingredients"]),
+        "steps": format_steps(recipe["directions"]),
+    }
+
+
+def how_to_make(title, ingredients, steps):
+    return (
+        f"To make **{title}**, you have to prepare these ingredients:\n\n{ingredients}"
+        f"\n\nAfter preparing the ingredients, you can follow these cooking steps:\n\n{steps}"
+    )
+
+
+def build_recipe_cards(store, path, extend=False, chunksize=10000):
+    # Ids never change once assigned (ingest.py appends), so with extend=True
+    # only the recipes added since the cards were written are rendered.
+    if not extend or not os.path.exists(os.path.join(path, "meta.json")):
+        records = 0
+    else:
+        # Cards past the end of the store were rendered by an ingest.py run
+        # that never committed (its rows have been rolled back).
+        records = min(_read_meta(path)["count"], len(store))
+    with RecipeStoreWriter(path, columns=CARD_COLUMNS, records=records) as writer:
+        for start in range(writer.count, len(store), chunksize):
+            end = min(start + chunksize, len(store))
+            writer.append(render_card(store[i]) for i in range(start, end))
+    return RecipeCards(path)
+
+
+class RecipeCards:
+    def __init__(self, path):
+        self.store = RecipeStore(path)
+
+    def __len__(self):
+        return len(self.store)
+
+    def ingredients(self, idx):
+        return self.store.get(idx, "ingredients")
+
+    def steps(self, idx):
+        return self.store.get(idx, "steps")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        raise SystemExit("usage: python recipe_cards.py recipe_store recipe_cards")
+    cards = build_recipe_cards(RecipeStore(sys.argv[1]), sys.argv[2])
+    print(f"wrote {len(cards)} recipe cards")
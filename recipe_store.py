@@ -0,0 +1,280 @@
+"""Offset-indexed, memory-mapped recipe store.
+
+Layout of a store directory:
+    data.bin     UTF-8 field values, concatenated
+    offsets.i64  int64 field boundaries; field j of recipe i spans
+                 offsets[i * ncols + j] : offsets[i * ncols + j + 1]
+    meta.json    {"columns": [...], "count": n}
+    keys.u64     per recipe: hash of its natural key (link, else title)
+    hashes.u64   per recipe: hash of its content, to skip unchanged re-ingests
+    deleted.i64  ids of deleted / replaced recipes (see ingest.py)
+
+Recipe ids are FAISS ids, so a hit is fetched with store[idx] in O(1)
+straight from the OS page cache, shared by every process that opens it.
+
+Convert the notebook's pickle with:
+    python recipe_store.py cleaned_recipes.pkl recipe_store
+"""
+import hashlib
+import json
+import mmap
+import os
+import sys
+from collections.abc import Mapping
+
+import numpy as np
+
+STORE_COLUMNS = ["title", "ingredients", "directions", "NER", "link"]
+
+
+def recipe_text(recipe):
+    # Same text that was embedded into the FAISS index.
+    return (
+        f"{recipe['title']}. Ingredients: {recipe['ingredients']}"
+        f". Directions: {recipe['directions']}"
+    )
+
+
+def _hash64(text):
+    digest = hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+def _field(record, column):
+    value = record.get(column, "")
+    if not isinstance(value, str):
+        value = "" if value is None or value != value else str(value)
+    return value
+
+
+def recipe_key(record):
+    return _field(record, "link") or _field(record, "title")
+
+
+def record_hashes(record, columns):
+    content = "\x1f".join(_field(record, c) for c in columns)
+    return _hash64(recipe_key(record)), _hash64(content)
+
+
+def _read_meta(path):
+    with open(os.path.join(path, "meta.json")) as f:
+        return json.load(f)
+
+
+def _write_meta(path, meta):
+    meta_path = os.path.join(path, "meta.json")
+    with open(meta_path + ".tmp", "w") as f:
+        json.dump(meta, f)
+    os.replace(meta_path + ".tmp", meta_path)
+
+
+class Recipe(Mapping):
+    __slots__ = ("store", "id")
+
+    def __init__(self, store, idx):
+        self.store = store
+        self.id = idx
+
+    def __getitem__(self, column):
+        return self.store.get(self.id, column)
+
+    def __iter__(self):
+        return iter(self.store.columns)
+
+    def __len__(self):
+        return len(self.store.columns)
+
+    def __repr__(self):
+        return f"Recipe({self.id}, {self['title']!r})"
+
+
+class RecipeStore:
+    def __init__(self, path):
+        meta = _read_meta(path)
+        self.path = path
+        self.columns = meta["columns"]
+        self._col = {c: j for j, c in enumerate(self.columns)}
+        self._count = meta["count"]
+        ncols = len(self.columns)
+        self._offsets = np.memmap(
+            os.path.join(path, "offsets.i64"),
+            dtype="int64",
+            mode="r",
+            shape=(self._count * ncols + 1,),
+        )
+        with open(os.path.join(path, "data.bin"), "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        self._data = memoryview(self._mm)
+
+        self.deleted = np.zeros(self._count, dtype=bool)
+        deleted_path = os.path.join(path, "deleted.i64")
+        if os.path.exists(deleted_path):
+            ids = np.fromfile(deleted_path, dtype="int64")
+            self.deleted[ids[ids < self._count]] = True
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, idx):
+        if not 0 <= idx < self._count:
+            raise IndexError(idx)
+        return Recipe(self, int(idx))
+
+    def get(self, idx, column):
+        pos = idx * len(self.columns) + self._col[column]
+        start, end = self._offsets[pos], self._offsets[pos + 1]
+        return str(self._data[start:end], "utf-8")
+
+    def __iter__(self):
+        # Yields deleted recipes too, so positions stay aligned with ids.
+        for idx in range(self._count):
+            yield Recipe(self, idx)
+
+    def is_deleted(self, idx):
+        return bool(self.deleted[idx])
+
+    def hashes(self):
+        # (key hashes, content hashes), one per recipe id
+        def load(name):
+            return np.fromfile(os.path.join(self.path, name), dtype="uint64", count=self._count)
+
+        return load("keys.u64"), load("hashes.u64")
+
+
+class DataFrameStore:
+    # Fallback for the legacy cleaned_recipes.pkl artifact.
+    def __init__(self, df):
+        self.df = df
+        self.columns = list(df.columns)
+        self.deleted = np.zeros(len(df), dtype=bool)
+
+    def __len__(self):
+        return len(self.df)
+
+    def __getitem__(self, idx):
+        return self.df.iloc[idx]
+
+    def __iter__(self):
+        for idx in range(len(self.df)):
+            yield self.df.iloc[idx]
+
+    def is_deleted(self, idx):
+        return False
+
+
+class RecipeStoreWriter:
+    def __init__(self, path, columns=None, records=None, deleted=None):
+        # records / deleted roll an existing store back to that many recipes
+        # and tombstones; records=0 starts a new one.
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        data_path = os.path.join(path, "data.bin")
+        offsets_path = os.path.join(path, "offsets.i64")
+        deleted_path = os.path.join(path, "deleted.i64")
+        hash_paths = [os.path.join(path, "keys.u64"), os.path.join(path, "hashes.u64")]
+
+        if os.path.exists(os.path.join(path, "meta.json")) and records != 0:
+            meta = _read_meta(path)
+            self.columns = meta["columns"]
+            self.count = meta["count"] if records is None else records
+            if not all(os.path.exists(p) for p in hash_paths):
+                self._backfill_hashes(hash_paths)
+        else:
+            self.columns = list(columns or STORE_COLUMNS)
+            self.count = 0
+            with open(offsets_path, "wb") as f:
+                f.write(np.zeros(1, dtype="int64").tobytes())
+            for p in [data_path, *hash_paths, deleted_path]:
+                open(p, "wb").close()
+
+        # Truncate anything past the last committed recipe (resume after a crash).
+        n_offsets = self.count * len(self.columns) + 1
+        with open(offsets_path, "r+b") as f:
+            f.truncate(n_offsets * 8)
+            f.seek((n_offsets - 1) * 8)
+            self._end = int(np.frombuffer(f.read(8), dtype="int64")[0])
+        with open(data_path, "r+b") as f:
+            f.truncate(self._end)
+        for p in hash_paths:
+            with open(p, "r+b") as f:
+                f.truncate(self.count * 8)
+        if deleted is not None and os.path.exists(deleted_path):
+            with open(deleted_path, "r+b") as f:
+                f.truncate(deleted * 8)
+        self.deleted_count = os.path.getsize(deleted_path) // 8 if os.path.exists(deleted_path) else 0
+
+        self._data_f = open(data_path, "ab")
+        self._offsets_f = open(offsets_path, "ab")
+        self._keys_f = open(hash_paths[0], "ab")
+        self._hashes_f = open(hash_paths[1], "ab")
+        self._deleted_f = open(deleted_path, "ab")
+        self._files = [self._data_f, self._offsets_f, self._keys_f, self._hashes_f, self._deleted_f]
+        _write_meta(path, {"columns": self.columns, "count": self.count})
+
+    def _backfill_hashes(self, hash_paths):
+        # Stores written before content hashes existed.
+        store = RecipeStore(self.path)
+        hashes = [record_hashes(recipe, self.columns) for recipe in store]
+        hashes = np.asarray(hashes, dtype="uint64").reshape(-1, 2)
+        hashes[:, 0].tofile(hash_paths[0])
+        hashes[:, 1].tofile(hash_paths[1])
+
+    def append(self, records):
+        # records: iterable of mappings, e.g. DataFrame.to_dict("records").
+        # Returns the ids assigned to them.
+        first_id = self.count
+        ends, hashes = [], []
+        for record in records:
+            for column in self.columns:
+                encoded = _field(record, column).encode("utf-8")
+                self._data_f.write(encoded)
+                self._end += len(encoded)
+                ends.append(self._end)
+            hashes.append(record_hashes(record, self.columns))
+            self.count += 1
+        self._offsets_f.write(np.asarray(ends, dtype="int64").tobytes())
+        hashes = np.asarray(hashes, dtype="uint64").reshape(-1, 2)
+        self._keys_f.write(np.ascontiguousarray(hashes[:, 0]).tobytes())
+        self._hashes_f.write(np.ascontiguousarray(hashes[:, 1]).tobytes())
+        return list(range(first_id, self.count))
+
+    def delete(self, ids):
+        ids = np.asarray(list(ids), dtype="int64")
+        self._deleted_f.write(ids.tobytes())
+        self.deleted_count += len(ids)
+
+    def flush(self):
+        for f in self._files:
+            f.flush()
+            os.fsync(f.fileno())
+        _write_meta(self.path, {"columns": self.columns, "count": self.count})
+
+    def close(self):
+        self.flush()
+        for f in self._files:
+            f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def convert_pickle(pickle_path, store_path, chunksize=10000):
+    import pandas as pd
+
+    df = pd.read_pickle(pickle_path)
+    columns = [c for c in STORE_COLUMNS if c in df.columns]
+    with RecipeStoreWriter(store_path, columns=columns, records=0) as writer:
+        for start in range(0, len(df), chunksize):
+            writer.append(df.iloc[start : start + chunksize].to_dict("records"))
+    return len(df)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        raise SystemExit("usage: python recipe_store.py cleaned_recipes.pkl recipe_store")
+    n = convert_pickle(sys.argv[1], sys.argv[2])
+    print(f"wrote {n} recipes to {sys.argv[2]}")
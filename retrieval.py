@@ -0,0 +1,167 @@
+"""Batched recipe search over the FAISS index.
+
+Bulk lookup from the command line, one query per line:
+    python retrieval.py queries.txt --out results.jsonl --top-k 5
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+
+from metrics import span
+
+DEFAULT_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+MAX_DISTANCE = 1.5
+
+
+class BatchResult:
+    def __init__(self, ids, distances, store=None, max_distance=MAX_DISTANCE):
+        self.ids = ids
+        self.distances = distances
+        self.store = store
+        self.max_distance = max_distance
+        self.mask = (ids != -1) & (distances <= max_distance)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def hit_ids(self, i):
+        return self.ids[i][self.mask[i]]
+
+    def records(self, i):
+        # Recipes are only materialized when a caller asks for them.
+        return [self.store[idx] for idx in self.hit_ids(i)]
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.records(i)
+
+
+def encode_queries(model, queries, batch_size=256):
+    vectors = model.encode(list(queries), batch_size=batch_size, convert_to_numpy=True)
+    return np.ascontiguousarray(vectors, dtype="float32")
+
+
+def search_vectors(index, vectors, top_k=5, store=None, max_distance=MAX_DISTANCE):
+    vectors = np.ascontiguousarray(vectors, dtype="float32")
+    with span("faiss"):
+        D, I = index.search(vectors, top_k)
+    return BatchResult(I, D, store, max_distance)
+
+
+def search_batch(model, index, queries, top_k=5, store=None, batch_size=256, max_distance=MAX_DISTANCE):
+    vectors = encode_queries(model, queries, batch_size)
+    return search_vectors(index, vectors, top_k, store, max_distance)
+
+
+def hybrid_search(
+    query,
+    encode,
+    index,
+    lexical,
+    top_k=5,
+    max_distance=MAX_DISTANCE,
+    candidates=20,
+    rrf_k=60,
+    is_deleted=None,
+):
+    from lexical_index import reciprocal_rank_fusion
+
+    # Exact title match: answer from the inverted index without embedding.
+    with span("lexical"):
+        exact = lexical.exact_title(query)
+        lexical_ids, _ = lexical.search(query, top_k if len(exact) else candidates)
+    if is_deleted is not None:
+        # A lexical index older than the store still lists replaced recipes.
+        exact = [i for i in exact if not is_deleted(i)]
+        lexical_ids = [i for i in lexical_ids if not is_deleted(i)]
+    if len(exact):
+        return list(dict.fromkeys(int(i) for i in [*exact, *lexical_ids]))[:top_k]
+
+    result = search_vectors(index, encode(query), candidates, max_distance=max_distance)
+    return reciprocal_rank_fusion([result.hit_ids(0), lexical_ids], k=rrf_k)[:top_k]
+
+
+def iter_query_blocks(path, block_size):
+    block = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            query = line.strip()
+            if query:
+                block.append(query)
+            if len(block) == block_size:
+                yield block
+                block = []
+    if block:
+        yield block
+
+
+def drop_deleted(result, store):
+    # Recipes deleted or replaced by ingest.py are tombstoned in the store.
+    for i, j in zip(*np.nonzero(result.mask)):
+        if store.is_deleted(int(result.ids[i, j])):
+            result.ids[i, j] = -1
+    result.mask &= result.ids != -1
+
+
+def main(argv=None):
+    from sentence_transformers import SentenceTransformer
+
+    from engine import load_index, load_store
+    from ingest import read_manifest
+
+    parser = argparse.ArgumentParser(description="Bulk recipe lookup")
+    parser.add_argument("queries", help="text file, one query per line")
+    parser.add_argument("--out", required=True, help=".jsonl with titles or .npz with ids")
+    parser.add_argument(
+        "--artifacts", default=".", help="build directory; follows manifest.json after ingest.py"
+    )
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--block-size", type=int, default=10000)
+    parser.add_argument("--max-distance", type=float, default=MAX_DISTANCE)
+    args = parser.parse_args(argv)
+
+    model = SentenceTransformer(args.model)
+    index = load_index(args.artifacts, read_manifest(args.artifacts))
+    store = load_store(args.artifacts)
+    as_arrays = args.out.endswith(".npz")
+
+    all_ids, all_distances = [], []
+    out = None if as_arrays else open(args.out, "w", encoding="utf-8")
+    try:
+        for block in iter_query_blocks(args.queries, args.block_size):
+            result = search_batch(
+                model, index, block, args.top_k, store, args.batch_size, args.max_distance
+            )
+            drop_deleted(result, store)
+            if as_arrays:
+                all_ids.append(result.ids)
+                all_distances.append(result.distances)
+                continue
+            for i, query in enumerate(block):
+                mask = result.mask[i]
+                row = {
+                    "query": query,
+                    "ids": result.ids[i][mask].tolist(),
+                    "distances": [round(float(d), 4) for d in result.distances[i][mask]],
+                    "titles": [recipe["title"] for recipe in result.records(i)],
+                }
+                out.write(json.dumps(row) + "\n")
+    finally:
+        if out:
+            out.close()
+
+    if as_arrays:
+        np.savez(
+            args.out,
+            ids=np.concatenate(all_ids) if all_ids else np.empty((0, args.top_k), "int64"),
+            distances=np.concatenate(all_distances) if all_distances else np.empty((0, args.top_k), "float32"),
+        )
+    print(f"wrote {os.path.abspath(args.out)}")
+
+
+if __name__ == "__main__":
+    main()
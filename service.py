@@ -0,0 +1,129 @@
+"""Headless recipe retrieval service.
+
+Run with:
+    uvicorn service:app --host 0.0.0.0 --port 8000
+
+Point the Streamlit UI at it with RECIPE_API_URL=http://localhost:8000.
+Encoder batching is tuned with RECIPE_MAX_BATCH and RECIPE_MAX_WAIT_MS.
+Per-stage latency histograms are served at /metrics for Prometheus.
+"""
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+
+from engine import RecipeEngine, recipe_to_dict
+from metrics import METRICS
+
+
+@asynccontextmanager
+async def lifespan(app):
+    loop = asyncio.get_running_loop()
+    app.state.engine = await loop.run_in_executor(
+        None, RecipeEngine, os.environ.get("RECIPE_ARTIFACTS", ".")
+    )
+    print(app.state.engine.startup_report())
+    app.state.executor = ThreadPoolExecutor(int(os.environ.get("RECIPE_WORKERS", 8)))
+    yield
+    app.state.executor.shutdown(wait=False)
+    app.state.engine.encoder.close()
+
+
+app = FastAPI(title="Recipe Retrieval Service", lifespan=lifespan)
+
+
+async def run_in_worker(fn, *args):
+    # Queries from concurrent workers are micro-batched by engine.encoder.
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(app.state.executor, fn, *args)
+
+
+async def search_recipes(q, top_k):
+    engine = app.state.engine
+    ids = await run_in_worker(engine.search_ids, q, top_k)
+    return [(i, engine.store[i]) for i in ids]
+
+
+def with_cards(data, recipe):
+    # Rendered here, from the pre-built recipe cards when there are any, so
+    # clients do not re-format every answer.
+    engine = app.state.engine
+    return {**data, "ingredients_card": engine.ingredients_card(recipe), "steps_card": engine.steps_card(recipe)}
+
+
+@app.get("/health")
+async def health():
+    engine = app.state.engine
+    return {"status": "ok", "recipes": len(engine.store), "ingredient_search": engine.can_cook()}
+
+
+@app.get("/stats")
+async def stats():
+    engine = app.state.engine
+    return {
+        "startup_s": engine.startup_timings,
+        "encoder": engine.encoder.metrics(),
+        "query_cache": engine.query_cache.stats(),
+        "answer_cache": engine.answer_cache.stats() if engine.answer_cache else None,
+    }
+
+
+@app.get("/metrics")
+async def metrics(format: str = "prometheus"):
+    if format == "json":
+        return METRICS.snapshot()
+    return PlainTextResponse(METRICS.prometheus_text(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/search")
+async def search(q: str = Query(..., min_length=1), top_k: int = Query(5, ge=1, le=50)):
+    results = await search_recipes(q, top_k)
+    return {"query": q, "results": [with_cards(recipe_to_dict(r, i), r) for i, r in results]}
+
+
+@app.get("/ingredients")
+async def ingredients(q: str = Query(..., min_length=1), top_k: int = Query(5, ge=1, le=50)):
+    results = await search_recipes(q, top_k)
+    if not results:
+        raise HTTPException(404, "No matching recipe")
+    engine = app.state.engine
+    return {
+        "query": q,
+        "results": [
+            {"id": i, "title": r["title"], "ingredients": engine.ingredients_card(r)}
+            for i, r in results
+        ],
+    }
+
+
+@app.get("/steps")
+async def steps(q: str = Query(..., min_length=1), top_k: int = Query(5, ge=1, le=50)):
+    results = await search_recipes(q, top_k)
+    if not results:
+        raise HTTPException(404, "No matching recipe")
+    engine = app.state.engine
+    return {
+        "query": q,
+        "results": [
+            {"id": i, "title": r["title"], "steps": engine.steps_card(r)}
+            for i, r in results
+        ],
+    }
+
+
+@app.get("/cook")
+async def cook(q: str = Query(..., min_length=1), top_k: int = Query(5, ge=1, le=50)):
+    if not app.state.engine.can_cook():
+        raise HTTPException(503, "Ingredient search is not available")
+    found, ranked = await run_in_worker(app.state.engine.cook, q, top_k)
+    return {
+        "query": q,
+        "ingredients": found,
+        "results": [
+            with_cards({**recipe_to_dict(recipe), "have": have, "total": total, "missing": missing}, recipe)
+            for recipe, have, total, missing in ranked
+        ],
+    }
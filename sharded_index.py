@@ -0,0 +1,159 @@
+"""Exact flat search split across shards and worker processes.
+
+A flat index is partitioned into N shards of raw float32 vectors plus their
+recipe ids, one .npy pair per shard. Worker processes open every shard with
+mmap, so they share one copy through the page cache. A query batch is
+searched on all shards in parallel, and the per-shard top-k lists are merged
+by distance. The result is the same as IndexFlatL2.search on the whole index.
+
+    python sharded_index.py recipe_faiss.index recipe_shards --shards 8
+
+The engine uses recipe_shards/ when it exists, with RECIPE_SHARD_WORKERS
+worker processes (default: one per shard, 0 = search in-process).
+"""
+import argparse
+import json
+import multiprocessing
+import os
+
+import numpy as np
+
+SHARDS_META = "shards.json"
+
+_worker_shards = None
+
+
+def index_vectors(index):
+    # (vectors, ids) of a flat index, or of an id-mapped one written by ingest.py.
+    import faiss
+
+    index = faiss.downcast_index(index)
+    if isinstance(index, (faiss.IndexIDMap, faiss.IndexIDMap2)):
+        ids = faiss.vector_to_array(index.id_map).astype("int64")
+        inner = faiss.downcast_index(index.index)
+    else:
+        ids = np.arange(index.ntotal, dtype="int64")
+        inner = index
+    if not isinstance(inner, faiss.IndexFlatL2):
+        raise SystemExit("Only flat indexes can be sharded; IVF / HNSW already avoid a full scan.")
+    return inner.reconstruct_n(0, inner.ntotal), ids
+
+
+def write_shards(vectors, ids, path, n_shards):
+    os.makedirs(path, exist_ok=True)
+    shards = []
+    for shard_no, part in enumerate(np.array_split(np.arange(len(ids)), n_shards)):
+        name = f"shard_{shard_no:03d}"
+        np.save(os.path.join(path, name + ".f32.npy"), np.ascontiguousarray(vectors[part], dtype="float32"))
+        np.save(os.path.join(path, name + ".ids.npy"), ids[part])
+        shards.append({"name": name, "count": int(len(part))})
+    meta = {"dim": int(vectors.shape[1]), "ntotal": int(len(ids)), "shards": shards}
+    with open(os.path.join(path, SHARDS_META), "w") as f:
+        json.dump(meta, f, indent=2)
+    return ShardedIndex(path, workers=0)
+
+
+def _open_shards(path):
+    with open(os.path.join(path, SHARDS_META)) as f:
+        meta = json.load(f)
+    shards = []
+    for shard in meta["shards"]:
+        vectors = np.load(os.path.join(path, shard["name"] + ".f32.npy"), mmap_mode="r")
+        ids = np.load(os.path.join(path, shard["name"] + ".ids.npy"), mmap_mode="r")
+        shards.append((vectors, ids))
+    return meta, shards
+
+
+def _search_one(shards, shard_no, queries, k):
+    import faiss
+
+    vectors, ids = shards[shard_no]
+    if not len(ids):
+        return (
+            np.full((len(queries), k), np.inf, dtype="float32"),
+            np.full((len(queries), k), -1, dtype="int64"),
+        )
+    D, I = faiss.knn(queries, vectors, min(k, len(ids)))
+    labels = np.where(I >= 0, ids[np.maximum(I, 0)], -1)
+    if D.shape[1] < k:
+        pad = k - D.shape[1]
+        D = np.pad(D, ((0, 0), (0, pad)), constant_values=np.inf)
+        labels = np.pad(labels, ((0, 0), (0, pad)), constant_values=-1)
+    return D, labels
+
+
+def _init_worker(path, threads):
+    global _worker_shards
+    import faiss
+
+    # N processes x all cores each would oversubscribe the CPU.
+    faiss.omp_set_num_threads(threads)
+    _, _worker_shards = _open_shards(path)
+
+
+def _worker_search(task):
+    shard_no, queries, k = task
+    return _search_one(_worker_shards, shard_no, queries, k)
+
+
+def merge_topk(results, k):
+    # Ties are broken by id so the merge is deterministic across shard counts.
+    D = np.concatenate([d for d, _ in results], axis=1)
+    I = np.concatenate([i for _, i in results], axis=1)
+    order = np.lexsort((I, D), axis=1)[:, :k]
+    D = np.take_along_axis(D, order, axis=1)
+    I = np.take_along_axis(I, order, axis=1)
+    I[~np.isfinite(D)] = -1
+    return D, I
+
+
+class ShardedIndex:
+    # Duck-types the part of faiss.Index used by retrieval.search_vectors.
+    def __init__(self, path, workers=None):
+        self.path = path
+        meta, self._shards = _open_shards(path)
+        self.d = meta["dim"]
+        self.ntotal = meta["ntotal"]
+        self.n_shards = len(meta["shards"])
+        self.workers = self.n_shards if workers is None else workers
+        self._pool = None
+        if self.workers > 0:
+            threads = max(1, (os.cpu_count() or 1) // self.workers)
+            # spawn: the parent may already run torch and encoder threads.
+            context = multiprocessing.get_context("spawn")
+            self._pool = context.Pool(self.workers, _init_worker, (path, threads))
+
+    def search(self, queries, k):
+        queries = np.ascontiguousarray(queries, dtype="float32")
+        tasks = [(shard_no, queries, k) for shard_no in range(self.n_shards)]
+        if self._pool is None:
+            results = [_search_one(self._shards, *task) for task in tasks]
+        else:
+            results = self._pool.map(_worker_search, tasks)
+        return merge_topk(results, k)
+
+    def close(self):
+        if getattr(self, "_pool", None) is not None:
+            self._pool.terminate()
+            self._pool = None
+
+    def __del__(self):
+        self.close()
+
+
+def main(argv=None):
+    import faiss
+
+    parser = argparse.ArgumentParser(description="Split a flat FAISS index into shards")
+    parser.add_argument("index", help="flat or id-mapped flat index, e.g. recipe_faiss.index")
+    parser.add_argument("out", help="output directory, e.g. recipe_shards")
+    parser.add_argument("--shards", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args(argv)
+
+    vectors, ids = index_vectors(faiss.read_index(args.index))
+    sharded = write_shards(vectors, ids, args.out, args.shards)
+    print(f"wrote {sharded.ntotal} vectors to {sharded.n_shards} shards in {args.out}")
+
+
+if __name__ == "__main__":
+    main()
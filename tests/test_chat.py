@@ -0,0 +1,164 @@
+"""Replays chat conversations through chat.Chat with an in-memory engine."""
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from chat import ANOTHER, ASK_NAME, WELCOME, Chat  # noqa: E402
+from recipe_cards import format_list, format_steps  # noqa: E402
+
+RECIPES = [
+    {"title": "Mexican Fried Rice", "ingredients": "1 c. raw rice, 1/4 c. oil", "directions": "Fry the rice. Add water."},
+    {"title": "Chinese Fried Rice", "ingredients": "carrots, rice, peas", "directions": "Boil the rice. Fry everything."},
+    {"title": "Meatballs", "ingredients": "ground beef, egg", "directions": "Mix. Broil 7 to 10 minutes."},
+    {"title": "Cocktail Meatballs", "ingredients": "ground beef, chili sauce", "directions": "Shape into balls. Simmer."},
+    {"title": "Raw Vegetable Salad", "ingredients": "cauliflower, broccoli", "directions": "Combine. Chill well."},
+    {"title": "Pizza Hot Dish", "ingredients": "hamburger, noodles", "directions": "Layer. Bake."},
+    {"title": "Zesty Pizza Sauce", "ingredients": "onion, garlic", "directions": "Simmer. Serve."},
+    {"title": "Fridge Cake", "ingredients": "biscuits, chocolate", "directions": "Melt. Chill overnight."},
+]
+
+
+class FakeEngine:
+    # The RecipeEngine interface used by Chat, over RECIPES.
+    def __init__(self, can_cook=True):
+        self._can_cook = can_cook
+
+    def search(self, query, top_k=3):
+        words = query.lower().split()
+        return [r for r in RECIPES if all(w in r["title"].lower() for w in words)][:top_k]
+
+    def ingredients_card(self, recipe):
+        return format_list(recipe["ingredients"])
+
+    def steps_card(self, recipe):
+        return format_steps(recipe["directions"])
+
+    def can_cook(self):
+        return self._can_cook
+
+    def cook(self, text, top_k=5):
+        found = [w.strip() for w in text.replace("I have", "").split(",") if w.strip()]
+        ranked = [
+            (r, 1, len(r["ingredients"].split(",")), [])
+            for r in RECIPES
+            if any(item in r["ingredients"] for item in found)
+        ]
+        return found, ranked[:top_k]
+
+
+@pytest.fixture
+def chat():
+    return Chat(FakeEngine(), SimpleNamespace())
+
+
+def turn(chat, message=None, button=None):
+    # Returns the bot replies to one user action.
+    before = len(chat.state.messages)
+    if button:
+        chat.press(button)
+    else:
+        chat.handle_message(message)
+    return [m["content"] for m in chat.state.messages[before:] if m["role"] == "assistant"]
+
+
+def title_line(reply):
+    return reply.split("\n")[0]
+
+
+def test_readme_conversation(chat):
+    assert chat.state.messages == [{"role": "assistant", "content": WELCOME}]
+
+    assert turn(chat, button="waiting_ingredient") == [ASK_NAME]
+    replies = turn(chat, "fried rice")
+    assert title_line(replies[0]) == "Here are the ingredients for **Mexican Fried Rice**:"
+    assert "- 1 c. raw rice\n- 1/4 c. oil" in replies[0]
+    assert replies[1] == ANOTHER
+    assert title_line(turn(chat, "yes")[0]) == "Here are the ingredients for **Chinese Fried Rice**:"
+    assert turn(chat, "no") == ["Okay! You can type another recipe name anytime. 🍳"]
+
+    assert turn(chat, button="waiting_direction") == [ASK_NAME]
+    replies = turn(chat, "meatball")
+    assert title_line(replies[0]) == "Here are the cooking steps for **Meatballs**:"
+    assert "1. Mix\n2. Broil 7 to 10 minutes." in replies[0]
+    assert title_line(turn(chat, "yes")[0]) == "Here are the cooking steps for **Cocktail Meatballs**:"
+    turn(chat, "no")
+
+    assert turn(chat, "thank you") == ["You're welcome! Let me know if you need anything else. 🍀"]
+
+    replies = turn(chat, "i want to make salad")
+    assert replies[0].startswith("To make **Raw Vegetable Salad**, you have to prepare these ingredients:")
+    assert "these cooking steps:\n\n1. Combine" in replies[0]
+    turn(chat, "no")
+
+    assert title_line(turn(chat, "give me pizza ingredients")[0]) == (
+        "Here are the ingredients for **Pizza Hot Dish**:"
+    )
+    assert title_line(turn(chat, "yes")[0]) == "Here are the ingredients for **Zesty Pizza Sauce**:"
+    turn(chat, "no")
+
+    assert turn(chat, "hello") == ["Hi there! 😊 How can I help you with your cooking today?"]
+    assert chat.state.mode == "menu"
+
+
+def test_how_to_then_yes_shows_next_recipe_the_same_way(chat):
+    turn(chat, "how to make pizza")
+    replies = turn(chat, "yes")
+    assert replies[0].startswith("To make **Zesty Pizza Sauce**")
+    assert turn(chat, "yes") == ["No more similar recipes found. 😔"]
+    assert chat.state.mode == "menu"
+
+
+def test_free_text_recipe_not_found_waits_for_a_name(chat):
+    assert turn(chat, "ingredients for unicorn stew") == [
+        "Sorry, I couldn’t find the ingredients for that recipe. 😔"
+    ]
+    assert chat.state.mode == "waiting_ingredient"
+    assert turn(chat, "lasagna") == ["Sorry, I couldn’t find that recipe. 😔 Please try another name."]
+    assert title_line(turn(chat, "meatballs")[0]) == "Here are the ingredients for **Meatballs**:"
+
+
+def test_keyword_without_recipe_asks_for_the_name(chat):
+    assert turn(chat, "steps") == [ASK_NAME]
+    assert chat.state.mode == "waiting_direction"
+    assert title_line(turn(chat, "chinese fried rice")[0]) == (
+        "Here are the cooking steps for **Chinese Fried Rice**:"
+    )
+
+
+def test_okay_no_more_is_a_no(chat):
+    turn(chat, "pizza ingredients")
+    assert turn(chat, "okay no more") == ["Okay! You can type another recipe name anytime. 🍳"]
+
+
+def test_fridge(chat):
+    turn(chat, button="waiting_fridge")
+    replies = turn(chat, "I have carrots, peas")
+    assert replies[0].startswith("You can make **Chinese Fried Rice** (you have 1 of 3 ingredients)")
+    assert chat.state.mode == "ask_another"
+    turn(chat, "no")
+    replies = turn(chat, "I have carrots, what can I make?")
+    assert replies[0].startswith("You can make **Chinese Fried Rice**")
+
+
+def test_fridge_words_inside_recipe_requests(chat):
+    assert turn(chat, "how to make fridge cake")[0].startswith("To make **Fridge Cake**")
+    turn(chat, "no")
+    assert title_line(turn(chat, "steps for fridge cake")[0]) == "Here are the cooking steps for **Fridge Cake**:"
+    turn(chat, "no")
+    assert turn(chat, "what ingredients do i have to buy for lasagna") == [
+        "Sorry, I couldn’t find the ingredients for that recipe. 😔"
+    ]
+    assert chat.state.mode == "waiting_ingredient"
+    chat.state.mode = "menu"
+    assert turn(chat, "I have a question: how to make pizza")[0].startswith("To make **Pizza Hot Dish**")
+
+
+def test_fridge_without_ingredient_index_returns_to_menu():
+    chat = Chat(FakeEngine(can_cook=False), SimpleNamespace())
+    turn(chat, button="waiting_fridge")
+    assert turn(chat, "chicken, rice") == ["Sorry, ingredient search is not available right now. 😔"]
+    assert chat.state.mode == "menu"
+    assert turn(chat, "hello") == ["Hi there! 😊 How can I help you with your cooking today?"]
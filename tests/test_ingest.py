@@ -0,0 +1,144 @@
+"""Upsert, delete and crash recovery of ingest.py on a build of sample_dataset.csv."""
+import contextlib
+import io
+import json
+import os
+import sys
+import zlib
+
+import numpy as np
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+import build_index  # noqa: E402
+import ingest  # noqa: E402
+from build_index import clean_chunk  # noqa: E402
+from ingest import RecipeIngestor, read_manifest  # noqa: E402
+from recipe_store import RecipeStore  # noqa: E402
+
+SAMPLE = os.path.join(ROOT, "sample_dataset.csv")
+
+
+class WordEncoder:
+    # Deterministic offline encoder: one hashed dimension per word.
+    def encode(self, sentences, batch_size=32, convert_to_numpy=True, **kwargs):
+        out = np.zeros((len(sentences), 32), dtype="float32")
+        for row, text in enumerate(sentences):
+            for word in text.lower().split():
+                out[row, zlib.crc32(word.encode()) % 32] += 1.0
+        return out
+
+
+def build(out, *extra):
+    with contextlib.redirect_stdout(io.StringIO()):
+        build_index.main([SAMPLE, "--out", str(out), "--chunksize", "4", *extra], model=WordEncoder())
+
+
+def sample_records():
+    return clean_chunk(pd.read_csv(SAMPLE, dtype=str)).to_dict("records")
+
+
+def changed_and_new():
+    records = sample_records()
+    changed = dict(records[0], directions=records[0]["directions"] + " Serve hot.")
+    new = dict(records[1], title="Weeknight Chicken Stew", link="example.com/weeknight-stew")
+    return records, changed, new
+
+
+@pytest.fixture
+def artifacts(tmp_path):
+    build(tmp_path)
+    return tmp_path
+
+
+def ingestor(artifacts):
+    return RecipeIngestor(str(artifacts), model=WordEncoder())
+
+
+def test_upsert_delete_commit(artifacts):
+    records, changed, new = changed_and_new()
+    n = len(records)
+
+    ing = ingestor(artifacts)
+    ing.upsert([changed, new, records[2]])
+    assert ing.commit() == 1
+    ing.close()
+    assert dict(ing.stats) == {"unchanged": 1, "updated": 1, "added": 1}
+    manifest = read_manifest(artifacts)
+    assert manifest["records"] == n + 2 and manifest["deleted"] == 1
+    assert os.path.exists(artifacts / manifest["recipe_faiss.index"])
+
+    store = RecipeStore(str(artifacts / "recipe_store"))
+    assert store.is_deleted(0)
+    assert store[n]["directions"].endswith("Serve hot.")
+    assert store[n + 1]["title"] == "Weeknight Chicken Stew"
+
+    ing = ingestor(artifacts)
+    assert ing.commit() == 1  # nothing changed, no new version
+    ing.delete([new["link"], "example.com/no-such-recipe"])
+    assert ing.commit() == 2
+    ing.close()
+    assert ing.stats["deleted"] == 1
+    assert ing.index.ntotal == n
+    assert read_manifest(artifacts)["deleted"] == 2
+
+
+def test_crash_before_manifest_rolls_back(artifacts, monkeypatch):
+    records, changed, new = changed_and_new()
+    ing = ingestor(artifacts)
+    ing.upsert([changed, new])
+
+    def crash(artifacts_dir, manifest):
+        raise RuntimeError("killed")
+
+    monkeypatch.setattr(ingest, "write_manifest", crash)
+    with pytest.raises(RuntimeError):
+        ing.commit()
+    ing.close()
+    monkeypatch.undo()
+    assert read_manifest(artifacts)["version"] == 0
+
+    ing = ingestor(artifacts)
+    store = RecipeStore(str(artifacts / "recipe_store"))
+    assert len(store) == len(records) and not store.deleted.any()
+    ing.upsert([changed, new])
+    assert dict(ing.stats) == {"updated": 1, "added": 1}
+    assert ing.commit() == 1
+    ing.close()
+    assert read_manifest(artifacts)["records"] == len(records) + 2
+
+
+def test_build_index_refuses_to_rerun_on_ingested_output(artifacts):
+    records, changed, new = changed_and_new()
+    ing = ingestor(artifacts)
+    ing.upsert([changed, new])
+    ing.commit()
+    ing.close()
+
+    with pytest.raises(SystemExit, match="--fresh"):
+        build(artifacts)
+    assert read_manifest(artifacts)["version"] == 1
+    assert len(RecipeStore(str(artifacts / "recipe_store"))) == len(records) + 2
+    os.rename(artifacts / "manifest.json", artifacts / "manifest.bak")
+    with pytest.raises(SystemExit, match="no longer matches"):
+        build(artifacts)
+    os.rename(artifacts / "manifest.bak", artifacts / "manifest.json")
+
+    build(artifacts, "--fresh")
+    assert not os.path.exists(artifacts / "manifest.json")
+    assert not list(artifacts.glob("recipe_faiss.v*"))
+    store = RecipeStore(str(artifacts / "recipe_store"))
+    assert len(store) == len(records) and not store.deleted.any()
+    with open(artifacts / "build" / "build_state.json") as f:
+        assert json.load(f)["records"] == len(records)
+
+
+def test_ingest_refuses_a_store_that_does_not_match_the_build(artifacts):
+    build(artifacts / "other", "--limit", "3")
+    os.replace(artifacts / "other" / "recipe_faiss.index", artifacts / "recipe_faiss.index")
+    with pytest.raises(SystemExit, match="rebuild both"):
+        ingestor(artifacts)
+    assert not os.path.exists(artifacts / "manifest.json")
+    assert len(RecipeStore(str(artifacts / "recipe_store"))) == len(sample_records())